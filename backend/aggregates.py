@@ -0,0 +1,425 @@
+from datetime import datetime, timezone
+from sqlalchemy import case, delete, func, select, text
+from sqlalchemy.orm import Session
+import logging
+import os
+import threading
+
+from database import SessionLocal, engine
+from models import Game, GameSentimentDaily, GameSentimentHourly, GameSentimentStats, Post, PostSentimentStats
+from prometheus_metrics import game_label, game_sentiment_mean
+from response_cache import response_cache
+
+logger = logging.getLogger(__name__)
+
+STATS_RECONCILE_SECONDS = float(os.getenv("GAME_STATS_RECONCILE_SECONDS", "600"))
+# pg_try_advisory_lock key held by the process that runs the reconciles.
+RECONCILE_LOCK_KEY = 7310422
+
+COUNTER_COLUMNS = (
+    "post_count",
+    "scored_count",
+    "sentiment_sum",
+    "positive_count",
+    "negative_count",
+    "neutral_count",
+)
+
+# Rollups only cover scored posts, so they carry every counter but post_count.
+ROLLUP_COLUMNS = COUNTER_COLUMNS[1:]
+
+ROLLUP_MODELS = {
+    "hour": GameSentimentHourly,
+    "day": GameSentimentDaily,
+}
+
+# post_sentiment_stats counts comments where game stats count posts.
+COMMENT_COUNTER_COLUMNS = ("comment_count",) + ROLLUP_COLUMNS
+
+LABEL_COLUMNS = {
+    "POSITIVE": "positive_count",
+    "NEGATIVE": "negative_count",
+    "NEUTRAL": "neutral_count",
+}
+
+
+def dialect_insert(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"Upserts are not supported on {dialect}")
+    return insert
+
+
+def empty_delta() -> dict:
+    return {column: 0 for column in COUNTER_COLUMNS}
+
+
+def add_post(delta: dict, sentiment_result: dict = None, new_post: bool = True):
+    """Fold one post into a per-game delta.
+
+    ``new_post`` counts the post itself; ``sentiment_result`` (if any) adds
+    its score. Background scoring calls this with ``new_post=False`` because
+    the post was already counted when it was inserted.
+    """
+    if new_post:
+        delta["post_count"] += 1
+    if sentiment_result is not None:
+        delta["scored_count"] += 1
+        delta["sentiment_sum"] += sentiment_result['sentiment_score']
+        column = LABEL_COLUMNS.get(sentiment_result['label'])
+        if column:
+            delta[column] += 1
+    return delta
+
+
+def _increment(db: Session, model, key_columns: tuple, rows: list, columns: tuple, extra_set: dict = None):
+    """Multi-row upsert that adds ``columns`` of ``rows`` onto existing rows.
+
+    Callers pass rows sorted by key so concurrent writers lock them in the
+    same order.
+    """
+    insert = dialect_insert(db)
+    stmt = insert(model).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[getattr(model, column) for column in key_columns],
+        set_={
+            **{column: getattr(model, column) + stmt.excluded[column] for column in columns},
+            **(extra_set or {}),
+        }
+    )
+    db.execute(stmt)
+
+
+def apply_stats_deltas(db: Session, deltas: dict):
+    """Add ``{game_id: delta}`` to game_sentiment_stats in the caller's transaction."""
+    if not deltas:
+        return
+    rows = [{"game_id": game_id, **deltas[game_id]} for game_id in sorted(deltas)]
+    _increment(db, GameSentimentStats, ("game_id",), rows, COUNTER_COLUMNS, {"updated_at": func.now()})
+
+
+def apply_comment_stats_deltas(db: Session, deltas: dict):
+    """Add ``{post_id: delta}`` to post_sentiment_stats in the caller's transaction.
+
+    Deltas are built with ``empty_delta``/``add_post``, one call per comment.
+    """
+    if not deltas:
+        return
+    rows = [
+        {
+            "post_id": post_id,
+            "comment_count": deltas[post_id]["post_count"],
+            **{column: deltas[post_id][column] for column in ROLLUP_COLUMNS},
+        }
+        for post_id in sorted(deltas)
+    ]
+    _increment(db, PostSentimentStats, ("post_id",), rows, COMMENT_COUNTER_COLUMNS, {"updated_at": func.now()})
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour or day containing ``ts``, as a naive datetime."""
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    ts = ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        ts = ts.replace(hour=0)
+    return ts
+
+
+def add_rollup(rollups: dict, game_id: int, created_at: datetime, sentiment_result: dict):
+    """Fold one scored post into ``{(granularity, game_id, bucket_start): delta}``."""
+    for granularity in ROLLUP_MODELS:
+        key = (granularity, game_id, bucket_start(created_at, granularity))
+        delta = rollups.setdefault(key, {column: 0 for column in ROLLUP_COLUMNS})
+        add_post(delta, sentiment_result, new_post=False)
+    return rollups
+
+
+def apply_rollup_deltas(db: Session, rollups: dict):
+    """Add the hourly and daily rollup deltas in the caller's transaction."""
+    for granularity, model in ROLLUP_MODELS.items():
+        rows = []
+        for key in sorted(rollups):
+            key_granularity, game_id, bucket = key
+            if key_granularity == granularity:
+                rows.append({"game_id": game_id, "bucket_start": bucket, **rollups[key]})
+        if rows:
+            _increment(db, model, ("game_id", "bucket_start"), rows, ROLLUP_COLUMNS)
+
+
+def record_post(db: Session, game_id: int, sentiment_result: dict = None, created_at: datetime = None):
+    """Count a newly inserted post (scored or pending) for its game.
+
+    Scored posts are also added to the rollup buckets for ``created_at``.
+    """
+    apply_stats_deltas(db, {game_id: add_post(empty_delta(), sentiment_result)})
+    if sentiment_result is not None and created_at is not None:
+        apply_rollup_deltas(db, add_rollup({}, game_id, created_at, sentiment_result))
+
+
+def stats_avg(stats_row) -> float:
+    if stats_row is None or not stats_row.scored_count:
+        return None
+    return stats_row.sentiment_sum / stats_row.scored_count
+
+
+def avg_sentiment_expr():
+    return GameSentimentStats.sentiment_sum / func.nullif(GameSentimentStats.scored_count, 0)
+
+
+def reconcile_game_stats(db: Session) -> int:
+    """Recompute every game's totals from posts in one grouped query.
+
+    Fixes drift from manual edits or failed writes. On PostgreSQL the stats
+    table is locked against concurrent increments for the duration, so a
+    post committed during the recompute is neither lost nor double-counted.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("LOCK TABLE game_sentiment_stats IN SHARE ROW EXCLUSIVE MODE"))
+
+    totals = db.execute(
+        select(
+            Game.id,
+            func.count(Post.id),
+            func.count(Post.sentiment_score),
+            func.coalesce(func.sum(Post.sentiment_score), 0.0),
+            func.coalesce(func.sum(case((Post.sentiment_label == 'POSITIVE', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Post.sentiment_label == 'NEGATIVE', 1), else_=0)), 0),
+            func.coalesce(func.sum(case((Post.sentiment_label == 'NEUTRAL', 1), else_=0)), 0)
+        )
+        .outerjoin(Post, Game.id == Post.game_id)
+        .group_by(Game.id)
+    ).all()
+
+    if not totals:
+        return 0
+
+    insert = dialect_insert(db)
+    rows = [dict(zip(("game_id",) + COUNTER_COLUMNS, row)) for row in totals]
+    stmt = insert(GameSentimentStats).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[GameSentimentStats.game_id],
+        set_={
+            **{column: stmt.excluded[column] for column in COUNTER_COLUMNS},
+            "updated_at": func.now(),
+        }
+    )
+    db.execute(stmt)
+    return len(rows)
+
+
+def _bucket_expr(db: Session, granularity: str):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc(granularity, Post.created_at)
+    # Same text layout SQLAlchemy uses for DateTime values on SQLite, so
+    # backfilled buckets collide with (and upsert into) app-written ones.
+    pattern = "%Y-%m-%d %H:00:00.000000" if granularity == "hour" else "%Y-%m-%d 00:00:00.000000"
+    return func.strftime(pattern, Post.created_at)
+
+
+def _bucket_expr_value(db: Session, value: datetime):
+    if db.get_bind().dialect.name == "postgresql":
+        return value
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+def rebuild_rollups(db: Session, since: datetime = None) -> dict:
+    """Recompute the hourly and daily rollups from posts.
+
+    With ``since`` only buckets from that day onwards are rebuilt. Like
+    ``reconcile_game_stats``, the rollup tables are locked on PostgreSQL so
+    concurrent writes land after the rebuild instead of being lost.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        tables = ", ".join(model.__tablename__ for model in ROLLUP_MODELS.values())
+        db.execute(text(f"LOCK TABLE {tables} IN SHARE ROW EXCLUSIVE MODE"))
+
+    start = bucket_start(since, "day") if since is not None else None
+    rebuilt = {}
+    for granularity, model in ROLLUP_MODELS.items():
+        cleared = delete(model)
+        if start is not None:
+            cleared = cleared.where(model.bucket_start >= start)
+        db.execute(cleared)
+
+        bucket = _bucket_expr(db, granularity)
+        totals = (
+            select(
+                Post.game_id,
+                bucket,
+                func.count(Post.sentiment_score),
+                func.sum(Post.sentiment_score),
+                func.count(case((Post.sentiment_label == 'POSITIVE', 1))),
+                func.count(case((Post.sentiment_label == 'NEGATIVE', 1))),
+                func.count(case((Post.sentiment_label == 'NEUTRAL', 1)))
+            )
+            .where(Post.sentiment_score.isnot(None))
+            .group_by(Post.game_id, bucket)
+        )
+        if start is not None:
+            totals = totals.where(bucket >= _bucket_expr_value(db, start))
+
+        result = db.execute(
+            model.__table__.insert().from_select(("game_id", "bucket_start") + ROLLUP_COLUMNS, totals)
+        )
+        rebuilt[granularity] = result.rowcount
+    return rebuilt
+
+
+def seed_sentiment_gauge(db: Session) -> int:
+    """Load every game's totals into the in-process running mean.
+
+    Also picks the top games for ``METRICS_GAME_LABEL=topk``. Totals are
+    summed per label, so games sharing a genre or ``other`` share a mean.
+    """
+    rows = (
+        db.query(
+            Game.id,
+            Game.name,
+            Game.genre,
+            GameSentimentStats.sentiment_sum,
+            GameSentimentStats.scored_count,
+            GameSentimentStats.post_count
+        )
+        .join(GameSentimentStats, Game.id == GameSentimentStats.game_id)
+        .all()
+    )
+
+    if game_label.strategy == "topk":
+        busiest = sorted(rows, key=lambda row: (-row.post_count, row.id))[:game_label.top_k]
+        game_label.set_top_games(row.id for row in busiest)
+
+    totals = {}
+    for game_id, name, genre, total, count, _ in rows:
+        label_totals = totals.setdefault(game_label(game_id, name, genre), [0.0, 0])
+        label_totals[0] += total
+        label_totals[1] += count
+    game_sentiment_mean.seed(totals)
+    return len(rows)
+
+
+class StatsReconciler:
+    """Periodically runs ``reconcile_game_stats`` on a background thread.
+
+    Every API process (gunicorn worker or container) starts one, but only
+    the leader reconciles: the process holding a PostgreSQL session advisory
+    lock, or an flock beside the SQLite file. The lock goes with its
+    holder's connection or process, and another process takes over at its
+    next run. Each leader run also re-seeds the sentiment gauge from the
+    corrected totals; the other processes only re-seed theirs.
+    """
+
+    def __init__(self, interval=STATS_RECONCILE_SECONDS):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_conn = None
+        self._lock_file = None
+
+    def start(self):
+        if self._thread is not None or self.interval <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="stats-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self._release()
+
+    def is_leader(self) -> bool:
+        """Take (or confirm) the reconcile lock; False if another process holds it."""
+        if engine.dialect.name == "postgresql":
+            if self._lock_conn is not None:
+                try:
+                    self._lock_conn.execute(text("SELECT 1"))
+                    self._lock_conn.rollback()
+                    return True
+                except Exception as e:
+                    # The session, and with it the lock, is gone.
+                    logger.warning(f"Lost the stats reconcile lock: {e}")
+                    self._release()
+
+            conn = engine.connect()
+            try:
+                locked = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": RECONCILE_LOCK_KEY}).scalar()
+                # Session-level lock: it outlives the transaction.
+                conn.commit()
+            except Exception:
+                conn.close()
+                raise
+            if not locked:
+                conn.close()
+                return False
+            self._lock_conn = conn
+            logger.info("Took the stats reconcile lock")
+            return True
+
+        database = engine.url.database
+        if not database or database == ":memory:":
+            return True
+        if self._lock_file is None:
+            import fcntl
+
+            lock_file = open(f"{database}.reconcile.lock", "a")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
+
+    def _release(self):
+        if self._lock_conn is not None:
+            # Closing the DBAPI connection drops the session lock; returning
+            # it to the pool would keep the lock held.
+            self._lock_conn.invalidate()
+            self._lock_conn.close()
+            self._lock_conn = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def run_once(self) -> int:
+        db = SessionLocal()
+        try:
+            games = reconcile_game_stats(db)
+            db.commit()
+            response_cache.invalidate_all()
+            seed_sentiment_gauge(db)
+            logger.info(f"Reconciled sentiment stats for {games} games")
+            return games
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def reseed(self):
+        db = SessionLocal()
+        try:
+            seed_sentiment_gauge(db)
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self.is_leader():
+                    self.run_once()
+                else:
+                    self.reseed()
+            except Exception as e:
+                logger.error(f"Sentiment stats reconcile failed: {e}")
+            self._stop.wait(self.interval)
+
+
+stats_reconciler = StatsReconciler()
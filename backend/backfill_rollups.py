@@ -0,0 +1,46 @@
+"""
+Rebuild the hourly and daily sentiment rollups from existing posts.
+
+New posts keep the rollups current as they are written; run this once after
+upgrading (or after importing posts out of band) to fill in history:
+
+    DATABASE_URL=postgresql://... python backfill_rollups.py
+    DATABASE_URL=postgresql://... python backfill_rollups.py --days 7
+"""
+
+import argparse
+import logging
+from datetime import datetime, timedelta, timezone
+
+from aggregates import rebuild_rollups
+from database import Base, SessionLocal, engine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=None,
+                        help="only rebuild buckets from the last N days (default: everything)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+
+    since = datetime.now(timezone.utc) - timedelta(days=args.days) if args.days else None
+    db = SessionLocal()
+    try:
+        rebuilt = rebuild_rollups(db, since)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    for granularity, buckets in rebuilt.items():
+        logger.info(f"Rebuilt {buckets} {granularity} buckets")
+
+
+if __name__ == "__main__":
+    main()
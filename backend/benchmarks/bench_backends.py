@@ -0,0 +1,104 @@
+"""
+Micro-benchmark for the sentiment inference backends.
+
+Each backend is loaded in a fresh process so resident memory is measured
+in isolation. Reports model load time, RSS added by the model, single-text
+latency percentiles and batched throughput:
+
+    python benchmarks/bench_backends.py --backends torch torch-int8 onnx
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samples import SAMPLE_CONTENT
+
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(backend, iterations, batch_size):
+    from sentiment import SentimentModel
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    model = SentimentModel(backend)
+    load_s = time.perf_counter() - started
+    rss_model = rss_mb() - rss_before
+
+    model.score_batch(SAMPLE_CONTENT[:2])
+
+    latencies = []
+    for i in range(iterations):
+        text = SAMPLE_CONTENT[i % len(SAMPLE_CONTENT)]
+        started = time.perf_counter()
+        model.score_batch([text])
+        latencies.append(time.perf_counter() - started)
+
+    batch = [SAMPLE_CONTENT[i % len(SAMPLE_CONTENT)] for i in range(batch_size)]
+    rounds = max(1, iterations // batch_size)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        model.score_batch(batch)
+    throughput = rounds * batch_size / (time.perf_counter() - started)
+
+    return {
+        "backend": backend,
+        "load_s": load_s,
+        "rss_model_mb": rss_model,
+        "rss_total_mb": rss_mb(),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "texts_per_s": throughput,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch", "torch-int8", "onnx"])
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=16)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("spawn")
+    rows = []
+    for backend in args.backends:
+        with context.Pool(1) as pool:
+            try:
+                rows.append(pool.apply(measure, (backend, args.iterations, args.batch_size)))
+            except Exception as e:
+                print(f"{backend}: skipped ({e})")
+
+    header = (f"{'backend':>12} {'load s':>7} {'model MB':>9} {'RSS MB':>8} "
+              f"{'p50 ms':>8} {'p99 ms':>8} {'texts/s':>9}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['backend']:>12} {row['load_s']:>7.1f} {row['rss_model_mb']:>9.0f} "
+            f"{row['rss_total_mb']:>8.0f} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+            f"{row['texts_per_s']:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Read-heavy load benchmark comparing the sync and async database paths.
+
+Start the API twice against the same database, once per DB_MODE, e.g.
+
+    DB_MODE=sync  uvicorn main:app --port 8000
+    DB_MODE=async uvicorn main:app --port 8001
+
+then run
+
+    python benchmarks/bench_db_modes.py \
+        --target sync=http://localhost:8000 --target async=http://localhost:8001 \
+        --requests 2000 --concurrency 8 32 128
+
+Each request picks one of the read endpoints that always reach the database
+(post listings, search, a post's comments and thread sentiment), so the mix
+is identical for every target. Game listings and the top/worst analytics
+are left out: after the first request they are answered from the response
+cache, whichever DB_MODE is running. Throughput and p50/p99 latency are
+reported per concurrency.
+"""
+
+import argparse
+import random
+
+from loadgen import json_request, print_table, run_load
+
+# Uncached routes only; see the module docstring.
+READ_PATHS = (
+    "/api/posts?limit=50",
+    "/api/posts?game_id={game_id}&limit=50",
+    "/api/posts/search?q={term}&limit=20",
+    "/api/comments?post_id={post_id}&limit=50",
+    "/api/comments/sentiment?post_id={post_id}",
+)
+
+SEARCH_TERMS = ("game", "masterpiece", "buggy", "graphics", "story")
+
+
+def parse_target(value):
+    label, sep, url = value.partition("=")
+    if not sep:
+        return value, value
+    return label, url
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", type=parse_target,
+                        help="label=url of a running API (repeatable)")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--game-ids", type=int, nargs="+", default=list(range(1, 11)))
+    parser.add_argument("--post-ids", type=int, nargs="+", default=list(range(1, 101)))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    targets = args.target or [("default", "http://localhost:8000")]
+
+    rng = random.Random(args.seed)
+    paths = [
+        rng.choice(READ_PATHS).format(
+            game_id=rng.choice(args.game_ids),
+            post_id=rng.choice(args.post_ids),
+            term=rng.choice(SEARCH_TERMS)
+        )
+        for _ in range(args.requests)
+    ]
+    print("Uncached read endpoints only (the response-cached game and analytics routes are excluded)")
+
+    summary = []
+    for label, base_url in targets:
+        base_url = base_url.rstrip("/")
+        rows = [
+            run_load(lambda i: json_request(base_url + paths[i]), args.requests, level)
+            for level in args.concurrency
+        ]
+        print_table(rows, label=f"{label}: {base_url}")
+        summary.extend((label, row) for row in rows)
+
+    if len(targets) > 1:
+        print(f"\n{'target':>10} {'concurrency':>11} {'req/s':>9} {'p99 ms':>9}")
+        for level in args.concurrency:
+            for label, row in summary:
+                if row["concurrency"] == level:
+                    print(f"{label:>10} {level:>11} {row['rps']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
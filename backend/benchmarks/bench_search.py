@@ -0,0 +1,109 @@
+"""
+Compare full-text search against a naive ILIKE scan as the posts table grows.
+
+For each size the database is topped up with generate_sample_data.py
+(synthetic scores, no model) until it holds that many posts, then every
+term is queried both ways and p50/p99 latency of the first page is
+reported. Sizes are filled in ascending order, so one database serves the
+whole run:
+
+    DATABASE_URL=postgresql://... python benchmarks/bench_search.py --sizes 100000 1000000
+    python benchmarks/bench_search.py --database-url sqlite:////tmp/search.db
+
+The ILIKE query matches ``%term%`` against title or content, newest first;
+it can stop early for common terms but must scan every row for rare ones,
+which is what the "no match" term shows.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from sqlalchemy import create_engine, func, or_, select
+from sqlalchemy.orm import Session
+
+from database import DATABASE_URL, Base
+from loadgen import percentile
+from models import Post
+from search import install_search_index, search_query
+
+# Common, mid-frequency, two-word and absent terms from the sample templates.
+DEFAULT_TERMS = ["game", "masterpiece", "buggy mess", "steam deck", "no-such-word"]
+
+
+def ilike_query(term: str, limit: int):
+    pattern = f"%{term}%"
+    return (
+        select(Post)
+        .where(or_(Post.title.ilike(pattern), Post.content.ilike(pattern)))
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(limit)
+    )
+
+
+def top_up(database_url: str, engine, size: int, seed: int) -> int:
+    with Session(engine) as db:
+        count = db.execute(select(func.count(Post.id))).scalar()
+    if count < size:
+        print(f"Seeding {size - count} posts to reach {size}...", flush=True)
+        subprocess.run(
+            [sys.executable, os.path.join(BACKEND_DIR, "generate_sample_data.py"),
+             "--database-url", database_url, "--posts", str(size - count),
+             "--skip-model", "--seed", str(seed + count)],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        count = size
+    return count
+
+
+def time_query(engine, query, iterations: int):
+    latencies = []
+    with Session(engine) as db:
+        rows = len(db.execute(query).all())  # also warms the cache
+        for _ in range(iterations):
+            started = time.perf_counter()
+            db.execute(query).all()
+            latencies.append((time.perf_counter() - started) * 1000)
+    return rows, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DATABASE_URL, help="defaults to $DATABASE_URL")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--terms", nargs="+", default=DEFAULT_TERMS)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    dialect = engine.dialect.name
+    Base.metadata.create_all(bind=engine)
+    install_search_index(engine)
+
+    print(f"\n{'posts':>9} {'term':>14} {'method':>8} {'rows':>5} {'p50 ms':>9} {'p99 ms':>9}")
+    for size in sorted(args.sizes):
+        count = top_up(args.database_url, engine, size, args.seed)
+        if dialect == "postgresql":
+            with engine.begin() as conn:
+                conn.exec_driver_sql("ANALYZE posts")
+        for term in args.terms:
+            for method, query in (
+                ("fts", search_query(dialect, term, limit=args.limit)),
+                ("ilike", ilike_query(term, args.limit)),
+            ):
+                rows, latencies = time_query(engine, query, args.iterations)
+                print(f"{count:>9} {term:>14} {method:>8} {min(rows, args.limit):>5} "
+                      f"{percentile(latencies, 50):>9.1f} {percentile(latencies, 99):>9.1f}", flush=True)
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Micro-benchmark for the cost of turning a page of posts into a JSON body.
+
+Compares, per page of ``--rows`` posts (default 100) read from an in-memory
+SQLite database:
+
+- orm: ORM entities -> post_dict() -> response_model validation -> JSON,
+  the path the list endpoints used to take through FastAPI
+- columns+validate: column-only select -> row mappings -> TypeAdapter
+  validate + dump_json
+- columns+to_json: column-only select -> crud.row_dicts -> pydantic_core
+  to_json (crud.rows_json, what the list endpoints use now)
+
+"fetch+serialize" includes executing the query and building rows (ORM
+entities, mappings or row_dicts) and is the number to compare; "serialize"
+times only the step after that.
+
+    python benchmarks/bench_serialization.py --rows 100 --iterations 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from crud import POST_COLUMNS, post_dict, row_dicts, rows_json
+from database import Base
+from loadgen import percentile
+from models import Game, Post, User
+from samples import SAMPLE_CONTENT
+from schemas import PostPage
+
+page_adapter = TypeAdapter(PostPage)
+
+
+def seed(engine, rows: int):
+    now = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(Game), [{"name": "Benchmark Game", "genre": "RPG"}])
+        conn.execute(insert(User), [{"username": "bench"}])
+        conn.execute(insert(Post), [
+            {
+                "user_id": 1,
+                "game_id": 1,
+                "title": f"Post {i}",
+                "content": SAMPLE_CONTENT[i % len(SAMPLE_CONTENT)],
+                "sentiment_score": 0.5,
+                "sentiment_label": "POSITIVE",
+                "confidence": 0.9,
+                "created_at": now + timedelta(minutes=i),
+                "updated_at": now + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+
+
+def fastapi_json(page: dict) -> bytes:
+    # What FastAPI does with a dict and a response_model: validate, dump to
+    # JSON-compatible Python, then JSONResponse renders it.
+    content = page_adapter.dump_python(page_adapter.validate_python(page), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def orm_fetch(db):
+    query = (
+        select(Post, User.username, Game.name.label("game_name"))
+        .join(User, Post.user_id == User.id)
+        .join(Game, Post.game_id == Game.id)
+        .order_by(Post.id)
+    )
+    return db.execute(query).all()
+
+
+def orm_serialize(rows) -> bytes:
+    items = [post_dict(post, username, game_name) for post, username, game_name in rows]
+    return fastapi_json({"items": items, "next_cursor": None})
+
+
+def columns_query():
+    return (
+        select(*POST_COLUMNS)
+        .join(User, Post.user_id == User.id)
+        .join(Game, Post.game_id == Game.id)
+        .order_by(Post.id)
+    )
+
+
+def mappings_fetch(db):
+    return db.execute(columns_query()).mappings().all()
+
+
+def columns_validate(rows) -> bytes:
+    return page_adapter.dump_json(page_adapter.validate_python({"items": rows, "next_cursor": None}))
+
+
+def row_dicts_fetch(db):
+    return row_dicts(db.execute(columns_query()))
+
+
+def columns_to_json(rows) -> bytes:
+    return rows_json({"items": rows, "next_cursor": None})
+
+
+PATHS = (
+    ("orm", orm_fetch, orm_serialize),
+    ("columns+validate", mappings_fetch, columns_validate),
+    ("columns+to_json", row_dicts_fetch, columns_to_json),
+)
+
+
+def measure(engine, fetch, serialize, iterations: int):
+    full, serialize_only = [], []
+    with Session(engine) as db:
+        rows = fetch(db)
+        serialize(rows)
+        for _ in range(iterations):
+            db.expunge_all()
+            started = time.perf_counter()
+            serialize(fetch(db))
+            full.append((time.perf_counter() - started) * 1e6)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            serialize(rows)
+            serialize_only.append((time.perf_counter() - started) * 1e6)
+    return full, serialize_only
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="posts per page")
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    seed(engine, args.rows)
+
+    with Session(engine) as db:
+        bodies = {label: json.loads(serialize(fetch(db))) for label, fetch, serialize in PATHS}
+    if len({json.dumps(body, sort_keys=True) for body in bodies.values()}) != 1:
+        raise SystemExit("Serialization paths disagree on the response body")
+
+    print(f"\n{args.rows} rows per page, {args.iterations} iterations (microseconds per page)")
+    print(f"{'path':>18} {'fetch+ser p50':>14} {'fetch+ser p99':>14} {'ser p50':>9} {'ser p99':>9}")
+    for label, fetch, serialize in PATHS:
+        full, serialize_only = measure(engine, fetch, serialize, args.iterations)
+        print(f"{label:>18} {percentile(full, 50):>14.0f} {percentile(full, 99):>14.0f} "
+              f"{percentile(serialize_only, 50):>9.0f} {percentile(serialize_only, 99):>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
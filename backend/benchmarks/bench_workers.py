@@ -0,0 +1,148 @@
+"""
+Throughput and memory of the gunicorn launch mode as the worker count grows.
+
+For each ``--workers`` count, starts ``gunicorn -c gunicorn.conf.py`` on
+``--port`` against ``$DATABASE_URL`` (which needs the games from
+generate_sample_data.py), waits until every worker reports /ready, fires
+``--requests`` POST /api/posts at ``--concurrency`` and then reads each
+worker's memory from /proc (Linux only):
+
+- RSS: resident memory, counting pages shared with the master and the
+  other workers in full
+- PSS: each shared page divided by the number of processes mapping it, so
+  the PSS column sums to what the workers really cost together
+- shared: resident pages also mapped by another process (the preloaded
+  weights, with preload on)
+
+Post texts carry a unique suffix so the shared result cache never
+answers for the model. Compare with ``--no-preload`` to see what
+copy-on-write sharing saves:
+
+    python benchmarks/bench_workers.py --workers 1 2 4 --requests 400 --concurrency 32
+    python benchmarks/bench_workers.py --workers 1 2 4 --no-preload
+"""
+
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from loadgen import json_request, run_load
+from samples import SAMPLE_CONTENT
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def memory_kb(pid: int) -> dict:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+
+def worker_pids(master_pid: int) -> list:
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as children:
+        return [int(pid) for pid in children.read().split()]
+
+
+def wait_ready(url: str, workers: int, timeout: float):
+    # Requests are spread across workers, so wait for a run of successes
+    # long enough that every worker has most likely answered one.
+    deadline = time.monotonic() + timeout
+    streak = 0
+    while streak < 4 * workers:
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Server did not become ready within {timeout:.0f}s")
+        try:
+            with urllib.request.urlopen(f"{url}/ready", timeout=5) as response:
+                streak = streak + 1 if response.status == 200 else 0
+        except (urllib.error.URLError, OSError):
+            streak = 0
+            time.sleep(0.5)
+
+
+def start_server(workers: int, port: int, preload: bool):
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        GUNICORN_BIND=f"127.0.0.1:{port}",
+        GUNICORN_PRELOAD="true" if preload else "false",
+        PROMETHEUS_MULTIPROC_DIR=f"/tmp/bench-workers-prometheus-{port}",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+
+def stop_server(server):
+    server.send_signal(signal.SIGTERM)
+    try:
+        server.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--requests", type=int, default=400, help="posts per worker count")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--no-preload", action="store_true", help="load the model in every worker")
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--game-ids", type=int, nargs="+", default=list(range(1, 11)))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    url = f"http://127.0.0.1:{args.port}"
+
+    def make_request(i):
+        return json_request(f"{url}/api/posts", {
+            "title": f"Worker benchmark post {i}",
+            "content": f"{rng.choice(SAMPLE_CONTENT)} (#{rng.getrandbits(48)})",
+            "game_id": rng.choice(args.game_ids),
+            "username": f"bench_workers_{i % 50}",
+        })
+
+    preload = "off" if args.no_preload else "on"
+    print(f"\nPOST {url}/api/posts, {args.requests} requests at concurrency {args.concurrency}, preload {preload}")
+    print(f"{'workers':>7} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>6} "
+          f"{'RSS/worker MB':>13} {'PSS/worker MB':>13} {'shared/worker MB':>16} {'PSS total MB':>12}")
+    for workers in args.workers:
+        server = start_server(workers, args.port, not args.no_preload)
+        try:
+            wait_ready(url, workers, args.ready_timeout)
+            run_load(make_request, min(args.requests, 4 * args.concurrency), args.concurrency)
+            result = run_load(make_request, args.requests, args.concurrency)
+            memory = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        finally:
+            stop_server(server)
+
+        def per_worker_mb(key):
+            return sum(m[key] for m in memory) / len(memory) / 1024
+
+        print(f"{workers:>7} {result['rps']:>8.1f} {result['p50_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+              f"{result['errors']:>6} {per_worker_mb('rss'):>13.0f} {per_worker_mb('pss'):>13.0f} "
+              f"{per_worker_mb('shared'):>16.0f} {sum(m['pss'] for m in memory) / 1024:>12.0f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
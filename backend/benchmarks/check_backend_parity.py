@@ -0,0 +1,59 @@
+"""
+Parity check between sentiment inference backends.
+
+Scores the sample posts with the fp32 PyTorch model and with each other
+backend, then fails (exit code 1) if label agreement drops below
+--min-agreement or any signed sentiment score drifts by more than
+--score-tol:
+
+    python benchmarks/check_backend_parity.py --backends torch-int8 onnx
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from samples import SAMPLE_CONTENT
+from sentiment import SentimentModel
+
+
+def compare(reference, candidate):
+    agree = sum(ref['label'] == cand['label'] for ref, cand in zip(reference, candidate))
+    max_diff = max(
+        abs(ref['sentiment_score'] - cand['sentiment_score'])
+        for ref, cand in zip(reference, candidate)
+    )
+    return agree / len(reference), max_diff
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=["torch-int8", "onnx"])
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    parser.add_argument("--score-tol", type=float, default=0.05)
+    args = parser.parse_args()
+
+    texts = list(SAMPLE_CONTENT)
+    reference = SentimentModel("torch").score_batch(texts)
+
+    failed = False
+    for backend in args.backends:
+        candidate = SentimentModel(backend).score_batch(texts)
+        agreement, max_diff = compare(reference, candidate)
+        ok = agreement >= args.min_agreement and max_diff <= args.score_tol
+        failed = failed or not ok
+        print(
+            f"{backend:>12}: label agreement {agreement:.1%}, "
+            f"max score diff {max_diff:.4f} -> {'OK' if ok else 'FAIL'}"
+        )
+        for text, ref, cand in zip(texts, reference, candidate):
+            if ref['label'] != cand['label']:
+                print(f"    {ref['label']} -> {cand['label']}: {text[:60]}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Load benchmark for POST /api/posts.
+
+Fires bursts of concurrent post creations at a running API and reports how
+throughput and latency change with client concurrency. Run it once per
+server configuration (e.g. different SENTIMENT_BATCH_SIZE,
+SENTIMENT_INFERENCE_WORKERS or SENTIMENT_TORCH_THREADS) to compare:
+
+    python benchmarks/load_create_post.py --url http://localhost:8000 \
+        --requests 200 --concurrency 1 8 32 64
+"""
+
+import argparse
+import random
+
+from loadgen import json_request, print_table, run_load
+from samples import SAMPLE_CONTENT
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=200, help="posts per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--game-ids", type=int, nargs="+", default=list(range(1, 11)))
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    url = f"{args.url.rstrip('/')}/api/posts"
+
+    def make_request(i):
+        return json_request(url, {
+            "title": f"Load test post {i}",
+            "content": f"{rng.choice(SAMPLE_CONTENT)} (#{i})",
+            "game_id": rng.choice(args.game_ids),
+            "username": f"loadtest_user_{i % 50}",
+        })
+
+    rows = [run_load(make_request, args.requests, level) for level in args.concurrency]
+    print_table(rows, label=f"POST {url}")
+
+
+if __name__ == "__main__":
+    main()
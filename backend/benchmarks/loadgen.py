@@ -0,0 +1,73 @@
+"""
+Small stdlib-only HTTP load generator shared by the benchmark scripts.
+
+Each benchmark builds a ``make_request(i)`` callable returning a
+``urllib.request.Request`` and hands it to ``run_load``, which fires the
+requests from a thread pool and reports throughput and latency percentiles.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+import urllib.error
+import urllib.request
+
+
+def json_request(url, payload=None, method=None):
+    data = json.dumps(payload).encode() if payload is not None else None
+    return urllib.request.Request(
+        url,
+        data=data,
+        method=method or ("POST" if data is not None else "GET"),
+        headers={"Content-Type": "application/json"}
+    )
+
+
+def _timed_call(request, timeout):
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            ok = 200 <= response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_load(make_request, total, concurrency, timeout=60):
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda i: _timed_call(make_request(i), timeout), range(total)))
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok in results if ok]
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": total - len(latencies),
+        "elapsed_s": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_table(rows, label=""):
+    header = f"{'concurrency':>11} {'requests':>8} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}"
+    if label:
+        print(f"\n{label}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(
+            f"{row['concurrency']:>11} {row['requests']:>8} {row['errors']:>6} "
+            f"{row['rps']:>9.1f} {row['p50_ms']:>9.1f} {row['p99_ms']:>9.1f}"
+        )
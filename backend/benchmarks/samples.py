@@ -0,0 +1,18 @@
+"""Representative forum post texts shared by the benchmark scripts."""
+
+SAMPLE_CONTENT = [
+    "Absolutely loved the combat system, the boss fights are incredible.",
+    "Constant crashes and terrible performance, I want a refund.",
+    "It's okay. Some parts are fun, others drag on a bit too long.",
+    "The soundtrack and art direction are stunning, best game this year.",
+    "Servers are down again and matchmaking takes forever.",
+    "Just hit level 40, the crafting system finally clicked for me.",
+    "Not sure how I feel about the ending, need to think about it more.",
+    "Microtransactions everywhere. Pay to win garbage, uninstalled.",
+    "Co-op with friends is a blast, we played until 3am.",
+    "Patch 1.2 fixed some bugs but introduced new ones with the UI.",
+    "The open world feels alive, every corner has something to discover and the side quests "
+    "are written as carefully as the main story. Easily a hundred hours of content.",
+    "Loading times are brutal on last-gen consoles and the frame rate drops below 30 in every "
+    "big fight, which makes the harder bosses feel unfair rather than challenging.",
+]
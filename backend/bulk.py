@@ -0,0 +1,198 @@
+"""
+Bulk post ingestion for ``POST /api/posts/bulk``.
+
+The request body is either a JSON array of ``PostCreate`` objects or NDJSON
+(``Content-Type: application/x-ndjson``, one object per line), which is
+parsed as it streams in. Each item is validated on its own, so one bad
+item is reported in its result instead of failing the whole import.
+Valid items are scored in shared inference batches and written in one
+transaction: one upsert + one select for users, one multi-row INSERT for
+posts, and one stats/rollup upsert per table.
+"""
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+import json
+import os
+
+from aggregates import add_post, add_rollup, apply_rollup_deltas, apply_stats_deltas, dialect_insert, empty_delta
+from models import Game, Post, User
+from prometheus_metrics import sentiment_analysis_total, posts_created_total, game_label, game_sentiment_mean
+from response_cache import response_cache
+from schemas import PostCreate
+from scoring import PENDING_LABEL
+from sentiment import sentiment_analyzer
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "5000"))
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _parse_item(raw):
+    """A PostCreate, or an error message for the item's result."""
+    try:
+        if isinstance(raw, (str, bytes)):
+            raw = json.loads(raw)
+        return PostCreate.model_validate(raw)
+    except json.JSONDecodeError as e:
+        return f"Invalid JSON: {e.msg}"
+    except ValidationError as e:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc']) or 'item'}: {error['msg']}"
+            for error in e.errors()
+        )
+
+
+def _check_size(count: int):
+    if count > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} posts per request")
+
+
+async def read_items(request: Request) -> list:
+    """Parse the request body into a list of PostCreate or error strings."""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+
+    if content_type in NDJSON_TYPES:
+        items = []
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    items.append(_parse_item(line))
+            _check_size(len(items))
+        if buffer.strip():
+            items.append(_parse_item(buffer))
+        _check_size(len(items))
+        return items
+
+    try:
+        payload = await request.json()
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(payload, list):
+        raise HTTPException(status_code=422, detail="Body must be a JSON array of posts")
+    _check_size(len(payload))
+    return [_parse_item(raw) for raw in payload]
+
+
+async def score_items(items: list) -> list:
+    """Sentiment results aligned with ``items`` (None for invalid items)."""
+    texts = [item.content for item in items if isinstance(item, PostCreate)]
+    scores = iter(await sentiment_analyzer.analyze_batch_async(texts))
+    return [next(scores) if isinstance(item, PostCreate) else None for item in items]
+
+
+def resolve_users(db: Session, usernames) -> dict:
+    """``{username: user_id}``, creating missing users in one statement."""
+    usernames = sorted(set(usernames))
+    if not usernames:
+        return {}
+    db.execute(
+        dialect_insert(db)(User)
+        .values([{"username": username} for username in usernames])
+        .on_conflict_do_nothing(index_elements=[User.username])
+    )
+    rows = db.execute(select(User.username, User.id).where(User.username.in_(usernames))).all()
+    return dict(rows)
+
+
+def save_posts(db: Session, items: list, sentiment_results: list = None) -> list:
+    """Insert every valid item in one transaction; returns per-item results.
+
+    ``sentiment_results`` is None in background scoring mode, in which case
+    the posts are saved as PENDING.
+    """
+    results = [
+        {"index": index, "status": "error", "error": item}
+        if not isinstance(item, PostCreate) else None
+        for index, item in enumerate(items)
+    ]
+
+    game_ids = {item.game_id for item in items if isinstance(item, PostCreate)}
+    game_labels = {
+        game_id: game_label(game_id, name, genre)
+        for game_id, name, genre in db.execute(select(Game.id, Game.name, Game.genre).where(Game.id.in_(game_ids)))
+    } if game_ids else {}
+
+    pending = []
+    for index, item in enumerate(items):
+        if results[index] is not None:
+            continue
+        if item.game_id not in game_labels:
+            results[index] = {"index": index, "status": "error", "error": "Game not found"}
+            continue
+        pending.append(index)
+
+    if not pending:
+        return results
+
+    users = resolve_users(db, (items[index].username for index in pending))
+
+    rows = []
+    for index in pending:
+        item = items[index]
+        row = {
+            "user_id": users[item.username],
+            "game_id": item.game_id,
+            "title": item.title,
+            "content": item.content,
+            "sentiment_score": None,
+            "sentiment_label": PENDING_LABEL,
+            "confidence": None,
+        }
+        sentiment_result = sentiment_results[index] if sentiment_results is not None else None
+        if sentiment_result is not None:
+            row["sentiment_score"] = sentiment_result['sentiment_score']
+            row["sentiment_label"] = sentiment_result['label']
+            row["confidence"] = sentiment_result['confidence']
+        rows.append(row)
+
+    inserted = db.execute(
+        insert(Post).returning(Post.id, Post.created_at, sort_by_parameter_order=True),
+        rows
+    ).all()
+
+    deltas = {}
+    rollups = {}
+    for index, row, (post_id, created_at) in zip(pending, rows, inserted):
+        sentiment_result = sentiment_results[index] if sentiment_results is not None else None
+        add_post(deltas.setdefault(row["game_id"], empty_delta()), sentiment_result)
+        if sentiment_result is not None:
+            add_rollup(rollups, row["game_id"], created_at, sentiment_result)
+        results[index] = {
+            "index": index,
+            "status": "created",
+            "post_id": post_id,
+            "sentiment_label": row["sentiment_label"],
+            "sentiment_score": row["sentiment_score"],
+        }
+
+    apply_stats_deltas(db, deltas)
+    apply_rollup_deltas(db, rollups)
+    db.commit()
+    response_cache.invalidate_games(deltas)
+
+    for row in rows:
+        game_name = game_labels[row["game_id"]]
+        posts_created_total.labels(game_name=game_name).inc()
+        if row["sentiment_score"] is not None:
+            sentiment_analysis_total.labels(game_name=game_name, sentiment_label=row["sentiment_label"]).inc()
+            game_sentiment_mean.observe(game_name, row["sentiment_score"])
+
+    return results
+
+
+def summarize(results: list, elapsed: float) -> dict:
+    created = sum(1 for result in results if result["status"] == "created")
+    return {
+        "received": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "elapsed_seconds": round(elapsed, 4),
+        "rows_per_second": round(created / elapsed, 1) if elapsed > 0 else None,
+        "results": results,
+    }
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCache:
+    """In-process LRU cache with an optional per-entry TTL."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """LRU/TTL cache stored in a SQLite file, shared by every worker on a host.
+
+    Values must be JSON-serializable. Recency is tracked per read, and the
+    table is trimmed back to ``maxsize`` rows every ``trim_every`` writes so
+    eviction does not add a query to every ``set``.
+    """
+
+    def __init__(self, path: str, maxsize: int = 10000, ttl: float = None,
+                 table: str = "cache_entries", trim_every: int = 100):
+        self.path = path
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl or None
+        self.table = table
+        self.trim_every = max(1, trim_every)
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        conn = self._conn()
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{self.table}_accessed_at ON {self.table}(accessed_at)"
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        # A connection must not be used across fork(), e.g. when a
+        # pre-forking server built this cache in its master process.
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str):
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                return None
+            conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed: {e}")
+            return None
+
+    def set(self, key: str, value):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        try:
+            conn = self._conn()
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, now)
+            )
+            with self._lock:
+                self._writes += 1
+                trim = self._writes % self.trim_every == 0
+            if trim:
+                self._trim(conn, now)
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed: {e}")
+
+    def _trim(self, conn: sqlite3.Connection, now: float):
+        conn.execute(f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+        conn.execute(
+            f"DELETE FROM {self.table} WHERE key IN ("
+            f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.maxsize,)
+        )
+
+    def delete(self, key: str):
+        try:
+            self._conn().execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Cache delete failed: {e}")
+
+    def clear(self):
+        self._conn().execute(f"DELETE FROM {self.table}")
+
+    def __len__(self):
+        return self._conn().execute(f"SELECT count(*) FROM {self.table}").fetchone()[0]
+
+
+def build_cache(backend: str, maxsize: int, ttl: float = None, path: str = None, table: str = "cache_entries"):
+    """Create a cache for ``backend`` ("memory", "sqlite" or "none")."""
+    backend = (backend or "none").lower()
+    if backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(maxsize=maxsize, ttl=ttl)
+    if backend == "sqlite":
+        path = path or os.path.join(os.getenv("CACHE_DIR", "/tmp"), "forum_cache.sqlite3")
+        return SQLiteCache(path, maxsize=maxsize, ttl=ttl, table=table)
+    raise ValueError(f"Unknown cache backend: {backend}")
@@ -0,0 +1,122 @@
+"""
+Comments on posts: writes, per-post keyset pages and thread sentiment.
+
+Comments go through the same scoring paths as posts: inline through the
+shared batching engine (``sentiment_analyzer.analyze_async``), or saved as
+PENDING and scored by the background scorer. Each write also updates the
+post's row in ``post_sentiment_stats`` in the same transaction, so a
+thread's mood is a primary-key read instead of a scan of its comments.
+"""
+
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import func, insert, select, tuple_
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from aggregates import add_post, apply_comment_stats_deltas, empty_delta
+from bulk import resolve_users
+from models import Comment, Post, PostSentimentStats, User
+from pagination import decode_cursor, encode_cursor, keyset_timestamp
+from prometheus_metrics import comments_created_total
+from schemas import CommentCreate
+from scoring import PENDING_LABEL
+
+# Same field order as schemas.Comment.
+COMMENT_COLUMNS = (
+    Comment.content,
+    Comment.id,
+    Comment.post_id,
+    Comment.user_id,
+    Comment.sentiment_score,
+    Comment.sentiment_label,
+    Comment.created_at,
+    User.username
+)
+
+
+def comments_page_query(dialect: str, post_id: int, limit: int, cursor: Optional[str]):
+    """Oldest-first comments of one post; fetches one extra row to detect a next page."""
+    query = (
+        select(*COMMENT_COLUMNS)
+        .join(User, Comment.user_id == User.id)
+        .where(Comment.post_id == post_id)
+    )
+
+    created_at_key = keyset_timestamp(Comment.created_at, dialect)
+    if cursor:
+        created_at, comment_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(created_at_key, Comment.id)
+            > tuple_(keyset_timestamp(Comment.created_at, dialect, created_at), comment_id)
+        )
+
+    return query.order_by(created_at_key, Comment.id).limit(limit + 1)
+
+
+def comments_page(rows: list, limit: int) -> dict:
+    """Page of ``comments_page_query`` row dicts, ready for ``crud.rows_json``."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def thread_sentiment_query(post_id: int):
+    """The post's comment totals; no row means the post does not exist."""
+    return (
+        select(
+            Post.id.label("post_id"),
+            func.coalesce(PostSentimentStats.comment_count, 0).label("comment_count"),
+            func.coalesce(PostSentimentStats.scored_count, 0).label("scored_count"),
+            (PostSentimentStats.sentiment_sum / func.nullif(PostSentimentStats.scored_count, 0)).label("avg_sentiment"),
+            func.coalesce(PostSentimentStats.positive_count, 0).label("positive_count"),
+            func.coalesce(PostSentimentStats.negative_count, 0).label("negative_count"),
+            func.coalesce(PostSentimentStats.neutral_count, 0).label("neutral_count")
+        )
+        .outerjoin(PostSentimentStats, PostSentimentStats.post_id == Post.id)
+        .where(Post.id == post_id)
+    )
+
+
+def save_comment(db: Session, comment_data: CommentCreate, sentiment_result: dict = None) -> dict:
+    """Insert a comment and count it for its post, all in one transaction.
+
+    ``sentiment_result`` is None in background scoring mode, in which case
+    the comment is saved as PENDING.
+    """
+    if db.execute(select(Post.id).where(Post.id == comment_data.post_id)).first() is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    user_id = resolve_users(db, [comment_data.username])[comment_data.username]
+
+    values = {
+        "post_id": comment_data.post_id,
+        "user_id": user_id,
+        "content": comment_data.content,
+        "sentiment_score": None,
+        "sentiment_label": PENDING_LABEL,
+    }
+    if sentiment_result is not None:
+        values["sentiment_score"] = sentiment_result['sentiment_score']
+        values["sentiment_label"] = sentiment_result['label']
+
+    comment_id, created_at = db.execute(
+        insert(Comment).values(**values).returning(Comment.id, Comment.created_at)
+    ).one()
+    apply_comment_stats_deltas(db, {comment_data.post_id: add_post(empty_delta(), sentiment_result)})
+    db.commit()
+
+    comments_created_total.labels(sentiment_label=values["sentiment_label"]).inc()
+
+    return {
+        **values,
+        "id": comment_id,
+        "created_at": created_at,
+        "username": comment_data.username
+    }
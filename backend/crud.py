@@ -0,0 +1,354 @@
+"""
+Query builders and row mappers shared by the sync and async routers.
+
+Read endpoints build a ``select()`` here, execute it with either a
+``Session`` or an ``AsyncSession``, and turn the rows into response dicts
+with the matching ``*_dict`` helper. Writes are plain sync functions; the
+async routers call them through ``AsyncSession.run_sync``.
+"""
+
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException, Response
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+from sqlalchemy import case, func, select, tuple_
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from aggregates import ROLLUP_MODELS, avg_sentiment_expr, bucket_start, record_post
+from models import Game, GameSentimentStats, Post, User
+from pagination import decode_cursor, encode_cursor, keyset_timestamp
+from prometheus_metrics import (
+    sentiment_analysis_total,
+    posts_created_total,
+    game_label,
+    game_sentiment_mean
+)
+from response_cache import response_cache
+from schemas import GameAnalytics, GamesRanking, GameTrend, PostCreate
+from scoring import PENDING_LABEL
+
+
+def _json_serializer(response_type):
+    # Validate then dump, as FastAPI's response_model handling does, for
+    # responses the routers cache as raw JSON bodies.
+    adapter = TypeAdapter(response_type)
+    return lambda payload: adapter.dump_json(adapter.validate_python(payload))
+
+
+ranked_games_json = _json_serializer(List[GameAnalytics])
+games_ranking_json = _json_serializer(GamesRanking)
+game_trend_json = _json_serializer(GameTrend)
+
+
+def row_dicts(result) -> list:
+    """Plain dicts keyed by column label for a column-only ``select()`` result.
+
+    Cheaper than ``result.mappings()`` (whose rows go through the Mapping
+    protocol one key at a time) and serializable without a fallback.
+    """
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def rows_json(payload) -> bytes:
+    """Serialize ``row_dicts`` output (or a page wrapping it) straight to JSON.
+
+    The lean read path: column-only queries already return the response's
+    fields and types, so there are no ORM entities to hydrate and no
+    response_model validation pass.
+    """
+    return to_json(payload)
+
+
+def rows_response(payload) -> Response:
+    return Response(content=rows_json(payload), media_type="application/json")
+
+
+# Same field order as schemas.Game / schemas.Post.
+GAME_COLUMNS = (
+    Game.name,
+    Game.genre,
+    Game.description,
+    Game.image_url,
+    Game.id,
+    Game.created_at,
+    avg_sentiment_expr().label("avg_sentiment"),
+    func.coalesce(GameSentimentStats.post_count, 0).label("post_count")
+)
+
+POST_COLUMNS = (
+    Post.title,
+    Post.content,
+    Post.id,
+    Post.user_id,
+    Post.game_id,
+    Post.sentiment_score,
+    Post.sentiment_label,
+    Post.confidence,
+    Post.created_at,
+    Post.updated_at,
+    User.username,
+    Game.name.label("game_name")
+)
+
+
+def games_with_stats_query():
+    return (
+        select(*GAME_COLUMNS)
+        .outerjoin(GameSentimentStats, Game.id == GameSentimentStats.game_id)
+    )
+
+
+def game_with_stats_query(game_id: int):
+    return games_with_stats_query().where(Game.id == game_id)
+
+
+def trend_window_start(granularity: str, days: int) -> datetime:
+    return bucket_start(datetime.now(timezone.utc) - timedelta(days=days), granularity)
+
+
+def game_trend_query(game_id: int, granularity: str, since: datetime):
+    """One game's rollup buckets since ``since``, read from the rollup table only.
+
+    The game is outer-joined so a missing game (no rows) can be told apart
+    from a game with no scored posts in the window (one row of NULLs).
+    """
+    model = ROLLUP_MODELS[granularity]
+    return (
+        select(
+            Game.id,
+            model.bucket_start,
+            model.scored_count,
+            model.sentiment_sum,
+            model.positive_count,
+            model.negative_count,
+            model.neutral_count
+        )
+        .outerjoin(model, (model.game_id == Game.id) & (model.bucket_start >= since))
+        .where(Game.id == game_id)
+        .order_by(model.bucket_start)
+    )
+
+
+def game_trend(rows: list, game_id: int, granularity: str, since: datetime) -> dict:
+    points = [
+        {
+            "bucket_start": row.bucket_start,
+            "post_count": row.scored_count,
+            "avg_sentiment": row.sentiment_sum / row.scored_count if row.scored_count else None,
+            "positive_count": row.positive_count,
+            "negative_count": row.negative_count,
+            "neutral_count": row.neutral_count
+        }
+        for row in rows
+        if row.bucket_start is not None
+    ]
+    return {"game_id": game_id, "granularity": granularity, "window_start": since, "points": points}
+
+
+def posts_page_query(dialect: str, game_id: Optional[int], limit: int, cursor: Optional[str]):
+    """Newest-first posts page; fetches one extra row to detect a next page."""
+    query = (
+        select(*POST_COLUMNS)
+        .join(User, Post.user_id == User.id)
+        .join(Game, Post.game_id == Game.id)
+    )
+
+    if game_id:
+        query = query.where(Post.game_id == game_id)
+
+    created_at_key = keyset_timestamp(Post.created_at, dialect)
+    if cursor:
+        # Keyset: continue strictly after the last (created_at, id) seen,
+        # which stays an index range scan at any depth.
+        created_at, post_id = decode_cursor(cursor, datetime, int)
+        query = query.where(
+            tuple_(created_at_key, Post.id)
+            < tuple_(keyset_timestamp(Post.created_at, dialect, created_at), post_id)
+        )
+
+    return query.order_by(created_at_key.desc(), Post.id.desc()).limit(limit + 1)
+
+
+def post_dict(post: Post, username: str, game_name: str) -> dict:
+    return {
+        "id": post.id,
+        "user_id": post.user_id,
+        "game_id": post.game_id,
+        "title": post.title,
+        "content": post.content,
+        "sentiment_score": post.sentiment_score,
+        "sentiment_label": post.sentiment_label,
+        "confidence": post.confidence,
+        "created_at": post.created_at,
+        "updated_at": post.updated_at,
+        "username": username,
+        "game_name": game_name
+    }
+
+
+def posts_page(rows: list, limit: int) -> dict:
+    """Page of ``posts_page_query`` row dicts, ready for ``rows_json``."""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"])
+
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def post_status_query(post_id: int):
+    return select(Post.id, Post.sentiment_label, Post.sentiment_score, Post.confidence).where(Post.id == post_id)
+
+
+def post_status_dict(row) -> dict:
+    pending = row.sentiment_label == PENDING_LABEL
+    return {
+        "post_id": row.id,
+        "scoring_status": "pending" if pending else "scored",
+        "sentiment_label": None if pending else row.sentiment_label,
+        "sentiment_score": row.sentiment_score,
+        "confidence": row.confidence
+    }
+
+
+def games_ranking_query(dialect: str, limit: int, min_posts: int = 1, since: Optional[datetime] = None):
+    """Top and bottom ``limit`` games by average sentiment, in one query.
+
+    Without ``since`` the per-game totals come from game_sentiment_stats;
+    with it, scored posts created since then are aggregated once. Two
+    row_number() windows rank the same rows in both directions, so only
+    the games that are in either list come back.
+    """
+    if since is None:
+        totals = (
+            select(
+                GameSentimentStats.game_id,
+                avg_sentiment_expr().label("avg_sentiment"),
+                GameSentimentStats.scored_count.label("post_count"),
+                GameSentimentStats.positive_count,
+                GameSentimentStats.negative_count,
+                GameSentimentStats.neutral_count
+            )
+            .where(GameSentimentStats.scored_count >= min_posts)
+        )
+    else:
+        totals = (
+            select(
+                Post.game_id,
+                func.avg(Post.sentiment_score).label("avg_sentiment"),
+                func.count(Post.sentiment_score).label("post_count"),
+                func.count(case((Post.sentiment_label == 'POSITIVE', 1))).label("positive_count"),
+                func.count(case((Post.sentiment_label == 'NEGATIVE', 1))).label("negative_count"),
+                func.count(case((Post.sentiment_label == 'NEUTRAL', 1))).label("neutral_count")
+            )
+            .where(
+                keyset_timestamp(Post.created_at, dialect)
+                >= keyset_timestamp(Post.created_at, dialect, since)
+            )
+            .group_by(Post.game_id)
+            .having(func.count(Post.sentiment_score) >= min_posts)
+        )
+    totals = totals.subquery()
+
+    ranked = (
+        select(
+            totals,
+            Game.name.label("game_name"),
+            func.row_number().over(order_by=(totals.c.avg_sentiment.desc(), totals.c.game_id)).label("top_rank"),
+            func.row_number().over(order_by=(totals.c.avg_sentiment.asc(), totals.c.game_id)).label("bottom_rank")
+        )
+        .join(Game, Game.id == totals.c.game_id)
+        .subquery()
+    )
+
+    return (
+        select(ranked)
+        .where((ranked.c.top_rank <= limit) | (ranked.c.bottom_rank <= limit))
+        .order_by(ranked.c.top_rank)
+    )
+
+
+def ranked_game_dict(row) -> dict:
+    return {
+        "game_id": row.game_id,
+        "game_name": row.game_name,
+        "avg_sentiment": float(row.avg_sentiment),
+        "post_count": row.post_count,
+        "positive_count": row.positive_count,
+        "negative_count": row.negative_count,
+        "neutral_count": row.neutral_count
+    }
+
+
+def ranking_window_start(days: Optional[int]) -> Optional[datetime]:
+    if not days:
+        return None
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def games_ranking(rows: list, limit: int, min_posts: int = 1, since: Optional[datetime] = None) -> dict:
+    top = [ranked_game_dict(row) for row in rows if row.top_rank <= limit]
+    bottom = sorted(
+        (row for row in rows if row.bottom_rank <= limit),
+        key=lambda row: row.bottom_rank
+    )
+    return {
+        "top": top,
+        "bottom": [ranked_game_dict(row) for row in bottom],
+        "min_posts": min_posts,
+        "window_start": since
+    }
+
+
+def save_post(db: Session, post_data: PostCreate, sentiment_result: Optional[dict]) -> dict:
+    """Insert a post and update per-game stats in one transaction.
+
+    ``sentiment_result`` is None in background scoring mode: the post is
+    saved as PENDING and the BackgroundScorer fills in the sentiment later.
+    """
+    game = db.execute(select(Game).where(Game.id == post_data.game_id)).scalar_one_or_none()
+    if not game:
+        raise HTTPException(status_code=404, detail="Game not found")
+
+    user = db.execute(select(User).where(User.username == post_data.username)).scalar_one_or_none()
+    if not user:
+        user = User(username=post_data.username)
+        db.add(user)
+        db.flush()
+
+    metric_game = game_label(game.id, game.name, game.genre)
+    posts_created_total.labels(game_name=metric_game).inc()
+
+    new_post = Post(
+        user_id=user.id,
+        game_id=post_data.game_id,
+        title=post_data.title,
+        content=post_data.content
+    )
+    if sentiment_result is None:
+        new_post.sentiment_label = PENDING_LABEL
+    else:
+        sentiment_analysis_total.labels(
+            game_name=metric_game,
+            sentiment_label=sentiment_result['label']
+        ).inc()
+        new_post.sentiment_score = sentiment_result['sentiment_score']
+        new_post.sentiment_label = sentiment_result['label']
+        new_post.confidence = sentiment_result['confidence']
+
+    db.add(new_post)
+    db.flush()
+    record_post(db, game.id, sentiment_result, new_post.created_at)
+    db.commit()
+    response_cache.invalidate_games([game.id])
+    db.refresh(new_post)
+
+    if sentiment_result is not None:
+        game_sentiment_mean.observe(metric_game, sentiment_result['sentiment_score'])
+
+    return post_dict(new_post, user.username, game.name)
@@ -0,0 +1,123 @@
+"""
+Streaming export of posts joined with their user and game.
+
+Rows are read through a server-side cursor (``yield_per`` /
+``AsyncSession.stream``) and formatted one partition at a time, so memory
+stays flat no matter how many rows are exported. Used by
+``GET /api/posts/export`` and the ``export_posts.py`` CLI.
+"""
+
+from datetime import datetime, timezone
+from sqlalchemy import select
+from typing import Optional
+import csv
+import io
+import json
+import os
+
+from models import Game, Post, User
+from pagination import keyset_timestamp
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+EXPORT_COLUMNS = (
+    "id", "game_id", "game_name", "user_id", "username", "title", "content",
+    "sentiment_score", "sentiment_label", "confidence", "created_at", "updated_at",
+)
+
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """created_at is stored as naive UTC; convert aware filter values to match."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def export_query(dialect: str, game_id: Optional[int] = None,
+                 since: Optional[datetime] = None, until: Optional[datetime] = None):
+    query = (
+        select(
+            Post.id,
+            Post.game_id,
+            Game.name.label("game_name"),
+            Post.user_id,
+            User.username,
+            Post.title,
+            Post.content,
+            Post.sentiment_score,
+            Post.sentiment_label,
+            Post.confidence,
+            Post.created_at,
+            Post.updated_at
+        )
+        .join(User, Post.user_id == User.id)
+        .join(Game, Post.game_id == Game.id)
+    )
+    if game_id:
+        query = query.where(Post.game_id == game_id)
+    since, until = _naive_utc(since), _naive_utc(until)
+    if since is not None:
+        query = query.where(keyset_timestamp(Post.created_at, dialect) >= keyset_timestamp(Post.created_at, dialect, since))
+    if until is not None:
+        query = query.where(keyset_timestamp(Post.created_at, dialect) < keyset_timestamp(Post.created_at, dialect, until))
+    return query.order_by(Post.id)
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def header(fmt: str) -> str:
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(EXPORT_COLUMNS)
+        return buffer.getvalue()
+    return ""
+
+
+def format_rows(rows, fmt: str) -> str:
+    """Render one partition of rows as NDJSON lines or CSV records."""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows([_isoformat(value) for value in row] for row in rows)
+        return buffer.getvalue()
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, map(_isoformat, row))), ensure_ascii=False) + "\n"
+        for row in rows
+    )
+
+
+def iter_export(session_factory, fmt: str, batch_size: int = EXPORT_BATCH_SIZE, **filters):
+    """Yield the export as text chunks, one per ``batch_size`` rows.
+
+    The generator owns its session: a StreamingResponse body runs after the
+    request's dependencies have been closed.
+    """
+    db = session_factory()
+    try:
+        query = export_query(db.get_bind().dialect.name, **filters)
+        yield header(fmt)
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for rows in result.partitions():
+            yield format_rows(rows, fmt)
+    finally:
+        db.close()
+
+
+async def aiter_export(session_factory, fmt: str, batch_size: int = EXPORT_BATCH_SIZE, **filters):
+    async with session_factory() as db:
+        query = export_query(db.get_bind().dialect.name, **filters)
+        yield header(fmt)
+        result = await db.stream(query.execution_options(yield_per=batch_size))
+        async for rows in result.partitions():
+            yield format_rows(rows, fmt)
+
+
+def filename(fmt: str, game_id: Optional[int] = None) -> str:
+    scope = f"game-{game_id}" if game_id else "all"
+    return f"posts-{scope}-{datetime.utcnow():%Y%m%d%H%M%S}.{fmt}"
@@ -0,0 +1,54 @@
+"""
+Export posts (with username and game name) as NDJSON or CSV.
+
+Streams through a server-side cursor, so memory stays flat however many
+posts there are. Reads from READ_DATABASE_URL when it is set and fresh.
+
+    DATABASE_URL=postgresql://... python export_posts.py --format csv -o posts.csv
+    DATABASE_URL=postgresql://... python export_posts.py --game-id 3 --since 2024-01-01 > posts.ndjson
+"""
+
+import argparse
+import logging
+import sys
+import time
+from datetime import datetime
+
+from database import read_sessionmaker
+from export import EXPORT_BATCH_SIZE, EXPORT_FORMATS, iter_export
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--game-id", type=int, default=None)
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="only posts created at or after this ISO timestamp (UTC)")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None,
+                        help="only posts created before this ISO timestamp (UTC)")
+    parser.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE,
+                        help="rows fetched from the cursor per round trip")
+    parser.add_argument("-o", "--output", default="-", help="output file (default: stdout)")
+    args = parser.parse_args()
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    started = time.perf_counter()
+    written = 0
+    try:
+        for chunk in iter_export(read_sessionmaker(), args.format, args.batch_size,
+                                 game_id=args.game_id, since=args.since, until=args.until):
+            out.write(chunk)
+            written += len(chunk)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Exported {written} characters of {args.format} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
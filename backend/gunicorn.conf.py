@@ -0,0 +1,79 @@
+"""
+Gunicorn settings for the production launch mode:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Runs ``WEB_CONCURRENCY`` uvicorn worker processes, so inference in one
+worker no longer holds the GIL for every request. With ``GUNICORN_PRELOAD``
+(default on) the master imports the app, creates the tables and loads the
+model weights once before forking. Workers then share the weights
+copy-on-write instead of each loading its own copy, and each one runs only
+its own warm-up batches at startup.
+
+Metrics from every worker are aggregated through prometheus_client's
+multiprocess mode (``PROMETHEUS_MULTIPROC_DIR``), and the response and
+sentiment caches default to the sqlite backend shared by all workers.
+"""
+
+import gc
+import os
+import shutil
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+
+# Split the cores between workers so their torch thread pools do not
+# oversubscribe the CPU.
+os.environ.setdefault("SENTIMENT_TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // max(1, workers))))
+
+# In-memory caches are per process: a write in one worker would leave the
+# others serving cached responses for up to the TTL, and each worker would
+# score the same texts again. The sqlite backend shares both across workers.
+os.environ.setdefault("RESPONSE_CACHE_BACKEND", "sqlite")
+os.environ.setdefault("SENTIMENT_CACHE_BACKEND", "sqlite")
+
+# prometheus_client reads this when it is first imported, so it has to be
+# set (and the directory exist) here, before the app is loaded.
+multiproc_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-multiproc")
+os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def on_starting(server):
+    # Drop samples left behind by a previous run of the server. Files the
+    # master already opened while preloading are not needed: workers write
+    # their own, per-pid files.
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if not server.cfg.preload_app:
+        return
+
+    from database import Base, engine
+    from search import check_search_index
+    from sentiment import sentiment_analyzer
+
+    # Once here instead of racing in every worker's lifespan.
+    Base.metadata.create_all(bind=engine)
+    check_search_index(engine)
+    # Pooled connections must not be shared with the forked workers.
+    engine.dispose()
+
+    sentiment_analyzer.preload()
+
+    # Keep the collector from touching (and so copying) every object the
+    # master created, the model included, in each worker.
+    gc.freeze()
+    server.log.info("Preloaded app and sentiment model; forking workers")
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,12 +1,17 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
 import logging
 
-from database import engine, Base
-from routers import games, posts
+from aggregates import seed_sentiment_gauge, stats_reconciler
+from database import DB_MODE, engine, Base, SessionLocal, dispose_async_engine
+from routers import admin, async_comments, async_games, async_posts, comments, games, posts
 from prometheus_metrics import metrics_endpoint
-from sentiment import sentiment_analyzer
+from request_metrics import RequestMetricsMiddleware
+from scoring import background_scorer, background_scoring_enabled
+from search import check_search_index
+from sentiment import SentimentOverloaded, sentiment_analyzer
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,19 +25,33 @@ async def lifespan(app: FastAPI):
     logger.info("Starting Gaming Forum API...")
     
     Base.metadata.create_all(bind=engine)
+    check_search_index(engine)
     logger.info("✓ Database tables verified")
     
+    db = SessionLocal()
     try:
-        sentiment_analyzer.analyze("test")
-        logger.info("Sentiment analyzer ready")
-    except Exception as e:
-        logger.error(f"Failed to initialize sentiment analyzer: {e}")
+        seed_sentiment_gauge(db)
+    finally:
+        db.close()
+    
+    # Load and warm up the model in the background; /ready reports when
+    # it can score, and posts that arrive earlier wait in the queue.
+    sentiment_analyzer.start_loading()
+    
+    stats_reconciler.start()
+    
+    if background_scoring_enabled():
+        background_scorer.start()
     
     logger.info("Gaming Forum API is ready!")
     
     yield
     
     logger.info("Shutting down Gaming Forum API...")
+    background_scorer.stop()
+    stats_reconciler.stop()
+    sentiment_analyzer.shutdown()
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -50,8 +69,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(games.router)
-app.include_router(posts.router)
+# Added last so it is the outermost layer and times everything below it.
+app.add_middleware(RequestMetricsMiddleware)
+
+if DB_MODE == "async":
+    app.include_router(async_games.router)
+    app.include_router(async_posts.router)
+    app.include_router(async_comments.router)
+else:
+    app.include_router(games.router)
+    app.include_router(posts.router)
+    app.include_router(comments.router)
+
+app.include_router(admin.router)
+
+@app.exception_handler(SentimentOverloaded)
+async def sentiment_overloaded_handler(request: Request, exc: SentimentOverloaded):
+    # A write that cannot be scored is rejected rather than saved unscored.
+    logger.warning(f"Rejected {request.method} {request.url.path}, sentiment model overloaded: {exc}")
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 @app.get("/metrics")
 def metrics():
@@ -65,11 +101,24 @@ def health_check():
         "version": "1.0.0"
     }
 
+@app.get("/ready")
+def readiness_check():
+    sentiment_status = sentiment_analyzer.status
+    ready = sentiment_analyzer.is_ready
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={
+            "status": "ready" if ready else "not_ready",
+            "sentiment_model": sentiment_status
+        }
+    )
+
 @app.get("/")
 def root():
     return {
         "message": "Gaming Forum Sentiment Analysis API",
         "docs": "/docs",
         "health": "/health",
+        "ready": "/ready",
         "metrics": "/metrics"
     }
@@ -0,0 +1,62 @@
+"""
+Apply schema changes that ``Base.metadata.create_all`` cannot make on an
+existing database: new columns on existing tables and indexes that must
+be built without blocking writes.
+
+Fresh PostgreSQL databases get all of this from database/init.sql. Run it
+once per deploy, before starting the new app version; the app itself only
+checks for these at startup:
+
+    DATABASE_URL=postgresql://... python migrate.py
+"""
+
+import argparse
+import logging
+
+from sqlalchemy import inspect, text
+
+from database import Base, engine
+from models import Comment, Post
+from search import install_search_index
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Columns added to tables that already exist in deployed databases.
+ADDED_COLUMNS = [
+    Post.__table__.c.scoring_claimed_at,
+    Comment.__table__.c.scoring_claimed_at,
+]
+
+
+def add_missing_columns():
+    existing = {}
+    inspector = inspect(engine)
+    for column in ADDED_COLUMNS:
+        table = column.table.name
+        if table not in existing:
+            existing[table] = {c["name"] for c in inspector.get_columns(table)}
+        if column.name in existing[table]:
+            continue
+
+        # Nullable without a default, so this does not rewrite the table.
+        column_type = column.type.compile(dialect=engine.dialect)
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type}"))
+        logger.info(f"Added {table}.{column.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+
+    logger.info("Installing full-text search index (may take a while on a large posts table)...")
+    install_search_index(engine)
+    logger.info("✓ Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, ForeignKey, Index, PrimaryKeyConstraint, text
+from sqlalchemy.orm import declared_attr, relationship
 from sqlalchemy.sql import func
 from database import Base
 
@@ -14,6 +14,9 @@ class Game(Base):
     image_url = Column(String(500))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     posts = relationship("Post", back_populates="game", cascade="all, delete-orphan")
+    sentiment_stats = relationship(
+        "GameSentimentStats", back_populates="game", uselist=False, cascade="all, delete-orphan"
+    )
 
 
 class User(Base):
@@ -41,11 +44,73 @@ class Post(Base):
     confidence = Column(Float)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Set while a background scorer holds the PENDING post (see scoring.py).
+    scoring_claimed_at = Column(DateTime(timezone=True))
 
     user = relationship("User", back_populates="posts")
     game = relationship("Game", back_populates="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("idx_posts_game_created_id", "game_id", created_at.desc(), id.desc()),
+        Index(
+            "idx_posts_pending",
+            "id",
+            postgresql_where=text("sentiment_label = 'PENDING'"),
+            sqlite_where=text("sentiment_label = 'PENDING'")
+        ),
+    )
+    # Load created_at from the INSERT (RETURNING) so writers can bucket the
+    # post into the sentiment rollups without another query.
+    __mapper_args__ = {"eager_defaults": True}
+
+
+class GameSentimentStats(Base):
+    """Running sentiment totals per game, maintained alongside post writes.
+
+    ``post_count`` counts every post; the sentiment columns only cover
+    posts that have been scored, so pending posts never skew the average.
+    """
+    __tablename__ = "game_sentiment_stats"
+
+    game_id = Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    scored_count = Column(Integer, nullable=False, default=0, server_default="0")
+    sentiment_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    positive_count = Column(Integer, nullable=False, default=0, server_default="0")
+    negative_count = Column(Integer, nullable=False, default=0, server_default="0")
+    neutral_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    game = relationship("Game", back_populates="sentiment_stats")
+
+
+class SentimentRollupMixin:
+    """Scored-post totals for one game in one time bucket (UTC, bucket start)."""
+
+    bucket_start = Column(DateTime, nullable=False)
+    scored_count = Column(Integer, nullable=False, default=0, server_default="0")
+    sentiment_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    positive_count = Column(Integer, nullable=False, default=0, server_default="0")
+    negative_count = Column(Integer, nullable=False, default=0, server_default="0")
+    neutral_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+    @declared_attr
+    def game_id(cls):
+        return Column(Integer, ForeignKey("games.id", ondelete="CASCADE"), nullable=False)
+
+    @declared_attr.directive
+    def __table_args__(cls):
+        return (PrimaryKeyConstraint("game_id", "bucket_start"),)
+
+
+class GameSentimentHourly(SentimentRollupMixin, Base):
+    __tablename__ = "game_sentiment_hourly"
+
+
+class GameSentimentDaily(SentimentRollupMixin, Base):
+    __tablename__ = "game_sentiment_daily"
+
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -57,6 +122,35 @@ class Comment(Base):
     sentiment_score = Column(Float)
     sentiment_label = Column(String(20))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    scoring_claimed_at = Column(DateTime(timezone=True))
 
     post = relationship("Post", back_populates="comments")
     user = relationship("User", back_populates="comments")
+
+    __table_args__ = (
+        Index("idx_comments_post_created_id", "post_id", "created_at", "id"),
+        Index(
+            "idx_comments_pending",
+            "id",
+            postgresql_where=text("sentiment_label = 'PENDING'"),
+            sqlite_where=text("sentiment_label = 'PENDING'")
+        ),
+    )
+
+
+class PostSentimentStats(Base):
+    """Running comment sentiment totals per post (a thread's mood).
+
+    Same semantics as ``GameSentimentStats``: ``comment_count`` counts every
+    comment, the sentiment columns only the scored ones.
+    """
+    __tablename__ = "post_sentiment_stats"
+
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
+    scored_count = Column(Integer, nullable=False, default=0, server_default="0")
+    sentiment_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    positive_count = Column(Integer, nullable=False, default=0, server_default="0")
+    negative_count = Column(Integer, nullable=False, default=0, server_default="0")
+    neutral_count = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
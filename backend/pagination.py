@@ -0,0 +1,44 @@
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import func, literal
+import base64
+import json
+
+
+def encode_cursor(*values) -> str:
+    """Pack the sort key of the last row on a page into an opaque token."""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Unpack a token from ``encode_cursor``, converting each value to ``types``.
+
+    Raises a 400 for anything that was not produced by ``encode_cursor``.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("cursor has the wrong shape")
+        return tuple(
+            datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for kind, value in zip(types, values)
+        )
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+
+def keyset_timestamp(column, dialect: str, value: datetime = None):
+    """Timestamp expression to sort and compare on for keyset pagination.
+
+    SQLite stores timestamps as text, and rows written by a CURRENT_TIMESTAMP
+    default lack the microseconds SQLAlchemy adds to bound values, so equal
+    instants would compare unequal. On SQLite both sides are normalized
+    with strftime; other databases use the column (or value) as-is.
+    """
+    expr = column if value is None else literal(value, column.type)
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m-%d %H:%M:%f", expr)
+    return expr
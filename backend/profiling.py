@@ -0,0 +1,144 @@
+"""
+On-demand torch profiler captures of live inference batches.
+
+``POST /admin/profile`` arms a capture. The next inference worker to pick
+up a batch starts a ``torch.profiler`` session and keeps it running across
+its batches until the window has passed, then writes the trace to
+``SENTIMENT_PROFILE_DIR``:
+
+- ``chrome``: Chrome trace JSON, for Perfetto or chrome://tracing
+- ``stacks``: collapsed stacks (``frame;frame;frame value`` lines), the
+  format flamegraph.pl and speedscope read and py-spy's ``--format raw``
+  writes
+
+The profiler only sees ops on the thread that started it, so with several
+inference workers only the one that picked up the capture is traced. The
+window is checked after each batch; a capture still running when traffic
+stops is written after the next batch. For whole-process sampling without
+torch, attach py-spy from outside: ``py-spy record --pid <pid>``.
+"""
+
+from concurrent.futures import Future
+from datetime import datetime, timezone
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("SENTIMENT_PROFILE_DIR", "/tmp/sentiment-profiles")
+PROFILE_MAX_SECONDS = float(os.getenv("SENTIMENT_PROFILE_MAX_SECONDS", "60"))
+
+PROFILE_FORMATS = {
+    "chrome": ".json",
+    "stacks": ".stacks.txt"
+}
+
+
+class ProfileCapture:
+    """One armed capture; ``future`` resolves to a summary once the trace is written."""
+
+    def __init__(self, seconds: float, fmt: str):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.seconds = seconds
+        self.format = fmt
+        self.path = os.path.join(PROFILE_DIR, f"sentiment-{stamp}-{os.getpid()}{PROFILE_FORMATS[fmt]}")
+        self.future = Future()
+        self.thread = None
+        self.profiler = None
+        self.started = None
+        self.batches = 0
+        self.texts = 0
+
+
+class InferenceProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._capture = None
+
+    def request(self, seconds: float, fmt: str) -> ProfileCapture:
+        if fmt not in PROFILE_FORMATS:
+            raise ValueError(f"Unknown profile format: {fmt}")
+        with self._lock:
+            if self._capture is not None:
+                raise RuntimeError("A profile capture is already running")
+            self._capture = ProfileCapture(seconds, fmt)
+            return self._capture
+
+    def cancel(self, capture: ProfileCapture) -> bool:
+        """Withdraw a capture no worker has picked up; False if one already has."""
+        with self._lock:
+            if capture.thread is not None:
+                return False
+            if self._capture is capture:
+                self._capture = None
+            return True
+
+    def run(self, score_batch, texts: list) -> list:
+        """Call ``score_batch(texts)``, under the profiler if a capture is armed."""
+        if self._capture is None:
+            return score_batch(texts)
+
+        thread = threading.get_ident()
+        with self._lock:
+            capture = self._capture
+            if capture is not None and capture.thread is None:
+                try:
+                    capture.profiler = self._start(capture)
+                except Exception as e:
+                    self._capture = None
+                    capture.future.set_exception(e)
+                    logger.error(f"Failed to start profiler: {e}")
+                    return score_batch(texts)
+                capture.thread = thread
+                capture.started = time.perf_counter()
+        if capture is None or capture.thread != thread:
+            return score_batch(texts)
+
+        try:
+            return score_batch(texts)
+        finally:
+            capture.batches += 1
+            capture.texts += len(texts)
+            if time.perf_counter() - capture.started >= capture.seconds:
+                self._finish(capture)
+
+    @staticmethod
+    def _start(capture: ProfileCapture):
+        from torch.profiler import ProfilerActivity, profile
+
+        profiler = profile(
+            activities=[ProfilerActivity.CPU],
+            record_shapes=True,
+            with_stack=capture.format == "stacks"
+        )
+        profiler.start()
+        return profiler
+
+    def _finish(self, capture: ProfileCapture):
+        try:
+            capture.profiler.stop()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            if capture.format == "stacks":
+                capture.profiler.export_stacks(capture.path, "self_cpu_time_total")
+            else:
+                capture.profiler.export_chrome_trace(capture.path)
+            capture.future.set_result({
+                "path": capture.path,
+                "format": capture.format,
+                "seconds": round(time.perf_counter() - capture.started, 3),
+                "batches": capture.batches,
+                "texts": capture.texts
+            })
+            logger.info(f"Wrote {capture.format} profile of {capture.batches} batches to {capture.path}")
+        except Exception as e:
+            capture.future.set_exception(e)
+            logger.error(f"Failed to write profile: {e}")
+        finally:
+            with self._lock:
+                if self._capture is capture:
+                    self._capture = None
+
+
+inference_profiler = InferenceProfiler()
@@ -1,5 +1,35 @@
-from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    CONTENT_TYPE_LATEST
+)
 from fastapi import Response
+import os
+import threading
+import time
+
+# What the game_name label holds: the game's name (one series per game),
+# its id, its name for the METRICS_TOP_GAMES busiest games and "other" for
+# the rest, or its genre. Everything but name/id keeps cardinality fixed
+# as the catalog grows.
+METRICS_GAME_LABEL = os.getenv("METRICS_GAME_LABEL", "name").lower()
+METRICS_TOP_GAMES = int(os.getenv("METRICS_TOP_GAMES", "50"))
+
+# Serve /metrics from a snapshot at most this old; 0 renders every scrape.
+METRICS_CACHE_SECONDS = float(os.getenv("METRICS_CACHE_SECONDS", "0"))
+
+# Set (by gunicorn.conf.py) when several worker processes serve the app:
+# every process writes its samples to files in this directory and /metrics
+# aggregates them. Gauges declare how their per-process values combine.
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+GAME_LABEL_STRATEGIES = ("name", "id", "topk", "genre")
+OTHER_GAMES_LABEL = "other"
+UNKNOWN_GENRE_LABEL = "unknown"
 
 sentiment_analysis_total = Counter(
     'sentiment_analysis_total',
@@ -13,10 +43,17 @@ posts_created_total = Counter(
     ['game_name']
 )
 
+comments_created_total = Counter(
+    'comments_created_total',
+    'Total number of comments created',
+    ['sentiment_label']
+)
+
 game_sentiment_score = Gauge(
     'game_sentiment_score',
     'Current average sentiment score per game',
-    ['game_name']
+    ['game_name'],
+    multiprocess_mode='mostrecent'
 )
 
 api_request_duration = Histogram(
@@ -25,14 +62,217 @@ api_request_duration = Histogram(
     ['method', 'endpoint']
 )
 
+api_requests_in_progress = Gauge(
+    'api_requests_in_progress',
+    'HTTP requests currently being handled',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+api_request_db_duration = Histogram(
+    'api_request_db_duration_seconds',
+    'Time spent executing SQL per request',
+    ['method', 'endpoint'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+api_request_db_queries = Histogram(
+    'api_request_db_queries',
+    'SQL statements executed per request',
+    ['method', 'endpoint'],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+)
+
 sentiment_analysis_duration = Histogram(
     'sentiment_analysis_duration_seconds',
     'Sentiment analysis duration in seconds'
 )
 
+sentiment_stage_duration = Histogram(
+    'sentiment_stage_duration_seconds',
+    'Time per inference batch spent in each scoring stage (tokenize, forward, postprocess)',
+    ['stage'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+
+sentiment_batch_size = Histogram(
+    'sentiment_batch_size',
+    'Number of texts scored per inference batch',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+sentiment_queue_wait = Histogram(
+    'sentiment_queue_wait_seconds',
+    'Time a text spends in the batching queue before inference starts',
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+sentiment_cache_hits_total = Counter(
+    'sentiment_cache_hits_total',
+    'Sentiment results served from the result cache'
+)
+
+sentiment_cache_misses_total = Counter(
+    'sentiment_cache_misses_total',
+    'Sentiment lookups that had to run the model'
+)
+
+sentiment_scoring_backlog = Gauge(
+    'sentiment_scoring_backlog',
+    'Posts saved with a PENDING sentiment label that are waiting to be scored',
+    multiprocess_mode='mostrecent'
+)
+
+comment_scoring_backlog = Gauge(
+    'comment_scoring_backlog',
+    'Comments saved with a PENDING sentiment label that are waiting to be scored',
+    multiprocess_mode='mostrecent'
+)
+
+db_replica_lag_seconds = Gauge(
+    'db_replica_lag_seconds',
+    'Replication lag of the read replica at the last check',
+    multiprocess_mode='mostrecent'
+)
+
+db_read_routing_total = Counter(
+    'db_read_routing_total',
+    'Read-only requests by the database they were routed to',
+    ['target']
+)
+
+response_cache_lookups_total = Counter(
+    'response_cache_lookups_total',
+    'Response cache lookups by route and result (hit or miss)',
+    ['route', 'result']
+)
+
+response_cache_not_modified_total = Counter(
+    'response_cache_not_modified_total',
+    'Responses answered with 304 Not Modified because the client ETag matched',
+    ['route']
+)
+
+
+class GameLabels:
+    """Maps a game to its ``game_name`` label value under ``METRICS_GAME_LABEL``.
+
+    For ``topk`` the set of top games is refreshed with ``set_top_games``
+    whenever the sentiment gauge is seeded (startup and every stats
+    reconcile), so a game that climbs into the top K gets its own series
+    from then on while its earlier posts stay counted under ``other``.
+    """
+
+    def __init__(self, strategy=METRICS_GAME_LABEL, top_k=METRICS_TOP_GAMES):
+        if strategy not in GAME_LABEL_STRATEGIES:
+            raise ValueError(f"Unknown METRICS_GAME_LABEL: {strategy} (expected one of {', '.join(GAME_LABEL_STRATEGIES)})")
+        self.strategy = strategy
+        self.top_k = max(0, top_k)
+        self._top_games = frozenset()
+
+    def set_top_games(self, game_ids):
+        self._top_games = frozenset(game_ids)
+
+    def __call__(self, game_id: int, name: str, genre: str = None) -> str:
+        if self.strategy == "name":
+            return name
+        if self.strategy == "id":
+            return str(game_id)
+        if self.strategy == "genre":
+            return genre or UNKNOWN_GENRE_LABEL
+        return name if game_id in self._top_games else OTHER_GAMES_LABEL
+
+
+game_label = GameLabels()
+
+
+class RunningSentimentMean:
+    """Per-game running mean that keeps ``game_sentiment_score`` current.
+
+    Seeded from ``game_sentiment_stats`` at startup (and again after each
+    reconcile, which also folds in other workers' writes); every scored post
+    then updates it in O(1) without touching the database.
+    """
+
+    def __init__(self, gauge):
+        self._gauge = gauge
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def seed(self, totals: dict):
+        """Replace all running totals with ``{game_name: (score_sum, count)}``.
+
+        Series for labels missing from ``totals`` (games that dropped out of
+        the top K, say) are removed rather than left at a stale value. In
+        multiprocess mode a series cannot be removed from the worker's
+        file, so it is set to NaN instead.
+        """
+        with self._lock:
+            for name in self._totals.keys() - totals.keys():
+                if MULTIPROC_DIR:
+                    self._gauge.labels(game_name=name).set(float("nan"))
+                else:
+                    self._gauge.remove(name)
+            self._totals = {name: [float(total), int(count)] for name, (total, count) in totals.items()}
+            for name, (total, count) in self._totals.items():
+                self._gauge.labels(game_name=name).set(total / count if count else 0.0)
+
+    def observe(self, game_name: str, sentiment_score: float):
+        with self._lock:
+            totals = self._totals.setdefault(game_name, [0.0, 0])
+            totals[0] += sentiment_score
+            totals[1] += 1
+            mean = totals[0] / totals[1]
+        self._gauge.labels(game_name=game_name).set(mean)
+
+
+game_sentiment_mean = RunningSentimentMean(game_sentiment_score)
+
+
+def render_metrics() -> bytes:
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+class MetricsSnapshot:
+    """Rendered ``/metrics`` body, re-rendered at most once per ``max_age`` seconds.
+
+    ``generate_latest()`` walks every series under the registry lock, so
+    with many scrapers (or many series) rendering once per interval keeps
+    its CPU cost flat. Scrapes that arrive while a refresh is running get
+    the previous snapshot instead of waiting.
+    """
+
+    def __init__(self, max_age=METRICS_CACHE_SECONDS):
+        self.max_age = max_age
+        self._body = None
+        self._rendered_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> bytes:
+        if self.max_age <= 0:
+            return render_metrics()
+        if self._body is not None and time.monotonic() - self._rendered_at < self.max_age:
+            return self._body
+        if not self._lock.acquire(blocking=self._body is None):
+            return self._body
+        try:
+            if self._body is None or time.monotonic() - self._rendered_at >= self.max_age:
+                self._body = render_metrics()
+                self._rendered_at = time.monotonic()
+            return self._body
+        finally:
+            self._lock.release()
+
+
+metrics_snapshot = MetricsSnapshot()
+
 
 def metrics_endpoint():
     return Response(
-        content=generate_latest(),
+        content=metrics_snapshot.get(),
         media_type=CONTENT_TYPE_LATEST
     )
@@ -0,0 +1,114 @@
+"""
+Per-request latency, concurrency and database metrics.
+
+``RequestMetricsMiddleware`` is plain ASGI middleware. For every HTTP
+request it records:
+
+- ``api_request_duration_seconds{method,endpoint}``: wall time until the
+  response (including a streamed body) has been sent
+- ``api_requests_in_progress{method}``: requests currently in flight
+- ``api_request_db_duration_seconds`` / ``api_request_db_queries``: SQL
+  time and statement count attributed to the request
+
+``endpoint`` is the route template (``/api/games/{game_id}``), never the
+raw path, so label cardinality stays bounded; unrouted requests share
+``unmatched``.
+
+DB time comes from cursor events on every SQLAlchemy ``Engine`` (the async
+engines fire them on their sync core too). The middleware puts a mutable
+``RequestDBStats`` in a context variable; threadpool calls and
+``AsyncSession.run_sync`` greenlets inherit the context, so their queries
+are counted, while background workers see no stats and are skipped.
+"""
+
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import time
+
+from prometheus_metrics import (
+    api_request_db_duration,
+    api_request_db_queries,
+    api_request_duration,
+    api_requests_in_progress
+)
+
+KNOWN_METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+UNMATCHED_ENDPOINT = "unmatched"
+
+
+class RequestDBStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_request_db_stats: ContextVar = ContextVar("request_db_stats", default=None)
+
+# Start times per connection, kept as a stack (as in SQLAlchemy's query
+# profiling recipe) so a statement issued from inside another pairs up.
+_QUERY_STARTS = "request_metrics_query_starts"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _request_db_stats.get() is not None:
+        conn.info.setdefault(_QUERY_STARTS, []).append(time.perf_counter())
+
+
+def _finish_query(conn):
+    stats = _request_db_stats.get()
+    starts = conn.info.get(_QUERY_STARTS)
+    if stats is None or not starts:
+        return
+    stats.seconds += time.perf_counter() - starts.pop()
+    stats.queries += 1
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _finish_query(conn)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for a failed statement; pop its
+    # start so it is not paired with a later query on this connection.
+    if exception_context.connection is not None and exception_context.execution_context is not None:
+        _finish_query(exception_context.connection)
+
+
+def route_template(scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED_ENDPOINT
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in KNOWN_METHODS else "OTHER"
+        stats = RequestDBStats()
+        token = _request_db_stats.set(stats)
+        in_progress = api_requests_in_progress.labels(method=method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_db_stats.reset(token)
+
+            endpoint = route_template(scope)
+            api_request_duration.labels(method=method, endpoint=endpoint).observe(elapsed)
+            api_request_db_duration.labels(method=method, endpoint=endpoint).observe(stats.seconds)
+            api_request_db_queries.labels(method=method, endpoint=endpoint).observe(stats.queries)
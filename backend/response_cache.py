@@ -0,0 +1,140 @@
+"""
+Response cache for the read endpoints the frontend calls on every page load.
+
+Entries are serialized JSON bodies stored in a ``cache.py`` backend
+(``RESPONSE_CACHE_BACKEND``: memory, sqlite or none). Each key embeds the
+current token of every tag the response depends on; invalidating a tag
+just replaces its token, so stale entries become unreachable and age out
+through the LRU/TTL instead of being hunted down key by key:
+
+- ``game:<id>``: one game's detail, replaced when a post for it commits
+- ``games``: listings and rankings that include every game
+- ``all``: everything, replaced after a stats reconcile
+
+With the sqlite backend the tokens live in the shared file too, so a write
+in one worker invalidates the cached responses of every worker on the host.
+
+Tokens carry the time they were issued, so a body read from the replica is
+not stored while the replica may still be missing the write (see
+``ResponseCache.fillable``).
+"""
+
+from fastapi import Request, Response
+import hashlib
+import os
+import time
+import uuid
+
+from cache import build_cache
+from database import READ_REPLICA_MAX_LAG_SECONDS, is_replica_session
+from prometheus_metrics import response_cache_lookups_total, response_cache_not_modified_total
+
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH")
+# Browser/proxy freshness; 0 makes clients revalidate every time (cheap 304s).
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", "0"))
+
+ALL_TAG = "all"
+GAMES_TAG = "games"
+
+
+def game_tag(game_id: int) -> str:
+    return f"game:{game_id}"
+
+
+def _etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    def __init__(self, backend=RESPONSE_CACHE_BACKEND, maxsize=RESPONSE_CACHE_SIZE,
+                 ttl=RESPONSE_CACHE_TTL_SECONDS, path=RESPONSE_CACHE_PATH, max_age=RESPONSE_CACHE_MAX_AGE):
+        self.cache = build_cache(backend, maxsize=maxsize, ttl=ttl, path=path, table="response_cache")
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+
+    def _token(self, tag: str) -> str:
+        token = self.cache.get(f"tag:{tag}")
+        if token is None:
+            # Never seen, evicted or expired: start a fresh generation.
+            token = f"{uuid.uuid4().hex}@{time.time():.3f}"
+            self.cache.set(f"tag:{tag}", token)
+        return token
+
+    def key(self, route: str, tags, **params) -> str:
+        """Cache key for ``route`` with ``params``, bound to the tags' current tokens."""
+        if self.cache is None:
+            return None
+        query = "&".join(f"{name}={params[name]}" for name in sorted(params))
+        tokens = ",".join(self._token(tag) for tag in (ALL_TAG, *tags))
+        return f"{route}?{query}#{tokens}"
+
+    def lookup(self, request: Request, route: str, key: str):
+        """Cached response for ``key`` (200 or 304), or None on a miss."""
+        if key is None:
+            return None
+        entry = self.cache.get(key)
+        if entry is None:
+            response_cache_lookups_total.labels(route=route, result="miss").inc()
+            return None
+        response_cache_lookups_total.labels(route=route, result="hit").inc()
+        return self._respond(request, route, entry["body"].encode(), entry["etag"])
+
+    def fillable(self, key: str, db) -> bool:
+        """Whether a body read through session ``db`` may be cached under ``key``.
+
+        Cached routes read through the replica session, which may be up to
+        ``READ_REPLICA_MAX_LAG_SECONDS`` behind. A fill read there right
+        after a write would store the pre-write body under the token that
+        write just issued, and serve it until the TTL. So a replica read is
+        only cached once every token in its key is older than the lag limit;
+        until then the response is served but not stored. Reads from the
+        primary are always cached.
+        """
+        if key is None:
+            return False
+        if not is_replica_session(db):
+            return True
+        tokens = key.rpartition("#")[2].split(",")
+        # Tokens from before issue times were recorded count as old.
+        issued = max(float(token.partition("@")[2] or 0) for token in tokens)
+        return time.time() - issued >= READ_REPLICA_MAX_LAG_SECONDS
+
+    def store(self, request: Request, route: str, key: str, body: bytes, db) -> Response:
+        etag = _etag(body)
+        if self.fillable(key, db):
+            self.cache.set(key, {"body": body.decode(), "etag": etag})
+        return self._respond(request, route, body, etag)
+
+    def _respond(self, request: Request, route: str, body: bytes, etag: str) -> Response:
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if _etag_matches(request, etag):
+            response_cache_not_modified_total.labels(route=route).inc()
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def invalidate_games(self, game_ids):
+        if self.cache is None or not game_ids:
+            return
+        for game_id in set(game_ids):
+            self.cache.delete(f"tag:{game_tag(game_id)}")
+        self.cache.delete(f"tag:{GAMES_TAG}")
+
+    def invalidate_all(self):
+        if self.cache is not None:
+            self.cache.delete(f"tag:{ALL_TAG}")
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse
+from typing import Optional
+import asyncio
+import logging
+import os
+import secrets
+
+from profiling import PROFILE_FORMATS, PROFILE_MAX_SECONDS, inference_profiler
+from sentiment import sentiment_analyzer
+
+logger = logging.getLogger(__name__)
+
+# Admin endpoints are disabled unless a token is configured.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# How long past the window to wait for the batch that closes it.
+PROFILE_GRACE_SECONDS = 10.0
+
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+
+@router.post("/profile")
+async def profile_inference(
+    seconds: float = Query(10.0, gt=0, le=PROFILE_MAX_SECONDS),
+    format: str = Query("chrome", pattern=f"^({'|'.join(PROFILE_FORMATS)})$")
+):
+    """Profile live inference batches for ``seconds`` and return the trace file.
+
+    Needs scoring traffic during the window: returns 409 if no batch ran,
+    and 202 with the trace path if the window is still open when the
+    request gives up waiting.
+    """
+    if not sentiment_analyzer.is_ready:
+        raise HTTPException(status_code=503, detail="Sentiment model is not loaded")
+
+    try:
+        capture = inference_profiler.request(seconds, format)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    logger.info(f"Profiling inference for {seconds}s ({format})")
+    done, _ = await asyncio.wait([asyncio.wrap_future(capture.future)], timeout=seconds + PROFILE_GRACE_SECONDS)
+
+    if not done:
+        if inference_profiler.cancel(capture):
+            raise HTTPException(status_code=409, detail=f"No inference batches ran within {seconds}s")
+        return JSONResponse(
+            status_code=202,
+            content={"status": "capturing", "path": capture.path, "batches": capture.batches}
+        )
+
+    try:
+        summary = capture.future.result()
+    except Exception as e:
+        logger.error(f"Error profiling inference: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return FileResponse(
+        summary["path"],
+        filename=os.path.basename(summary["path"]),
+        headers={"X-Profile-Batches": str(summary["batches"]), "X-Profile-Texts": str(summary["texts"])}
+    )
@@ -0,0 +1,86 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+import logging
+
+import crud
+from database import get_async_read_db
+from response_cache import GAMES_TAG, game_tag, response_cache
+from schemas import Game as GameSchema, GameTrend
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/games", tags=["games"])
+
+
+@router.get("", response_model=List[GameSchema])
+async def get_games(request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    route = "/api/games"
+    try:
+        key = response_cache.key(route, [GAMES_TAG])
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
+        
+        rows = crud.row_dicts(await db.execute(crud.games_with_stats_query()))
+        
+        logger.info(f"Retrieved {len(rows)} games")
+        return response_cache.store(request, route, key, crud.rows_json(rows), db)
+    
+    except Exception as e:
+        logger.error(f"Error fetching games: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{game_id}", response_model=GameSchema)
+async def get_game(game_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    route = "/api/games/{game_id}"
+    try:
+        key = response_cache.key(route, [game_tag(game_id)], game_id=game_id)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
+        
+        row = (await db.execute(crud.game_with_stats_query(game_id))).mappings().first()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        return response_cache.store(request, route, key, crud.rows_json(dict(row)), db)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching game {game_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{game_id}/trend", response_model=GameTrend)
+async def get_game_trend(
+    game_id: int,
+    request: Request,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    days: int = Query(60, ge=1, le=365),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    route = "/api/games/{game_id}/trend"
+    try:
+        key = response_cache.key(route, [game_tag(game_id)], game_id=game_id, granularity=granularity, days=days)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
+        
+        since = crud.trend_window_start(granularity, days)
+        rows = (await db.execute(crud.game_trend_query(game_id, granularity, since))).all()
+        
+        if not rows:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        trend = crud.game_trend(rows, game_id, granularity, since)
+        return response_cache.store(request, route, key, crud.game_trend_json(trend), db)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching trend for game {game_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,229 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import logging
+import time
+
+import bulk
+import crud
+import export
+import search
+from database import async_read_sessionmaker, get_async_db, get_async_read_db
+from response_cache import GAMES_TAG, response_cache
+from schemas import BulkPostResponse, GameAnalytics, GamesRanking, Post as PostSchema, PostCreate, PostPage, PostScoringStatus, PostSearchPage
+from scoring import background_scorer, background_scoring_enabled
+from sentiment import SentimentOverloaded, sentiment_analyzer
+from prometheus_metrics import sentiment_analysis_duration
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/posts", tags=["posts"])
+
+
+@router.get("", response_model=PostPage)
+async def get_posts(
+    game_id: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    try:
+        query = crud.posts_page_query(db.get_bind().dialect.name, game_id, limit, cursor)
+        page = crud.posts_page(crud.row_dicts(await db.execute(query)), limit)
+        
+        logger.info(f"Retrieved {len(page['items'])} posts")
+        return crud.rows_response(page)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("", response_model=PostSchema)
+async def create_post(post_data: PostCreate, db: AsyncSession = Depends(get_async_db)):
+    # The write reuses the sync save_post through run_sync, so both router
+    # flavours share one transaction body.
+    try:
+        if background_scoring_enabled():
+            post_dict = await db.run_sync(crud.save_post, post_data, None)
+            background_scorer.notify()
+        else:
+            start_time = time.time()
+            sentiment_result = await sentiment_analyzer.analyze_async(post_data.content)
+            sentiment_analysis_duration.observe(time.time() - start_time)
+            
+            post_dict = await db.run_sync(crud.save_post, post_data, sentiment_result)
+        
+        logger.info(f"Created post {post_dict['id']} with sentiment: {post_dict['sentiment_label']}")
+        return post_dict
+    
+    except (HTTPException, SentimentOverloaded):
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error creating post: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk", response_model=BulkPostResponse)
+async def create_posts_bulk(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Create many posts from a JSON array or an NDJSON stream of PostCreate objects."""
+    started = time.perf_counter()
+    try:
+        items = await bulk.read_items(request)
+        
+        if background_scoring_enabled():
+            sentiment_results = None
+        else:
+            sentiment_results = await bulk.score_items(items)
+        
+        results = await db.run_sync(bulk.save_posts, items, sentiment_results)
+        if background_scoring_enabled():
+            background_scorer.notify()
+        
+        summary = bulk.summarize(results, time.perf_counter() - started)
+        logger.info(
+            f"Bulk created {summary['created']}/{summary['received']} posts "
+            f"({summary['rows_per_second']} rows/s)"
+        )
+        return summary
+    
+    except (HTTPException, SentimentOverloaded):
+        await db.rollback()
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"Error creating posts in bulk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search", response_model=PostSearchPage)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms, matched against title and content"),
+    game_id: Optional[int] = Query(None),
+    label: Optional[str] = Query(None, pattern="^(POSITIVE|NEGATIVE|NEUTRAL|PENDING)$"),
+    sort: str = Query("rank", pattern="^(rank|recent)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    try:
+        query = search.search_query(db.get_bind().dialect.name, q, game_id, label, sort, limit, cursor)
+        rows = crud.row_dicts(await db.execute(query))
+        page = search.search_page(rows, limit, sort)
+        
+        logger.info(f"Search {q!r} returned {len(page['items'])} posts")
+        return crud.rows_response(page)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+async def export_posts(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    game_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None, description="Only posts created at or after this time (UTC)"),
+    until: Optional[datetime] = Query(None, description="Only posts created before this time (UTC)")
+):
+    """Stream posts with their username and game name as NDJSON or CSV."""
+    try:
+        factory = await async_read_sessionmaker()
+        logger.info(f"Exporting posts as {format} (game_id={game_id}, since={since}, until={until})")
+        return StreamingResponse(
+            export.aiter_export(factory, format, game_id=game_id, since=since, until=until),
+            media_type=export.EXPORT_FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="{export.filename(format, game_id)}"'}
+        )
+    
+    except Exception as e:
+        logger.error(f"Error exporting posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{post_id}/status", response_model=PostScoringStatus)
+async def get_post_status(post_id: int, db: AsyncSession = Depends(get_async_db)):
+    try:
+        post = (await db.execute(crud.post_status_query(post_id))).first()
+        
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        
+        return crud.post_status_dict(post)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching status for post {post_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _games_ranking(db, limit: int, min_posts: int = 1, days: Optional[int] = None) -> dict:
+    since = crud.ranking_window_start(days)
+    query = crud.games_ranking_query(db.get_bind().dialect.name, limit, min_posts, since)
+    return crud.games_ranking((await db.execute(query)).all(), limit, min_posts, since)
+
+
+@router.get("/analytics/games-ranking", response_model=GamesRanking)
+async def get_games_ranking(
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    min_posts: int = Query(1, ge=1, description="Only rank games with at least this many scored posts"),
+    days: Optional[int] = Query(None, ge=1, le=365, description="Only count posts from the last N days"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    route = "/api/posts/analytics/games-ranking"
+    try:
+        key = response_cache.key(route, [GAMES_TAG], limit=limit, min_posts=min_posts, days=days)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
+        
+        ranking = await _games_ranking(db, limit, min_posts, days)
+        return response_cache.store(request, route, key, crud.games_ranking_json(ranking), db)
+    
+    except Exception as e:
+        logger.error(f"Error fetching games ranking: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/top-games", response_model=List[GameAnalytics])
+async def get_top_games(request: Request, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_async_read_db)):
+    route = "/api/posts/analytics/top-games"
+    try:
+        key = response_cache.key(route, [GAMES_TAG], limit=limit)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
+        
+        ranking = await _games_ranking(db, limit)
+        return response_cache.store(request, route, key, crud.ranked_games_json(ranking["top"]), db)
+    
+    except Exception as e:
+        logger.error(f"Error fetching top games: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/worst-games", response_model=List[GameAnalytics])
+async def get_worst_games(request: Request, limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_async_read_db)):
+    route = "/api/posts/analytics/worst-games"
+    try:
+        key = response_cache.key(route, [GAMES_TAG], limit=limit)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
+        
+        ranking = await _games_ranking(db, limit)
+        return response_cache.store(request, route, key, crud.ranked_games_json(ranking["bottom"]), db)
+    
+    except Exception as e:
+        logger.error(f"Error fetching worst games: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from typing import Optional
+import logging
+import time
+
+import comments
+import crud
+from database import get_db, get_read_db
+from schemas import Comment as CommentSchema, CommentCreate, CommentPage, PostCommentSentiment
+from scoring import background_scorer, background_scoring_enabled
+from sentiment import SentimentOverloaded, sentiment_analyzer
+from prometheus_metrics import sentiment_analysis_duration
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/comments", tags=["comments"])
+
+
+@router.post("", response_model=CommentSchema)
+async def create_comment(comment_data: CommentCreate, db: Session = Depends(get_db)):
+    # Scored on the shared inference executor, so concurrent comments and
+    # posts are batched into the same forward passes.
+    try:
+        if background_scoring_enabled():
+            comment = await run_in_threadpool(comments.save_comment, db, comment_data, None)
+            background_scorer.notify()
+        else:
+            start_time = time.time()
+            sentiment_result = await sentiment_analyzer.analyze_async(comment_data.content)
+            sentiment_analysis_duration.observe(time.time() - start_time)
+            
+            comment = await run_in_threadpool(comments.save_comment, db, comment_data, sentiment_result)
+        
+        logger.info(f"Created comment {comment['id']} on post {comment['post_id']} with sentiment: {comment['sentiment_label']}")
+        return comment
+    
+    except (HTTPException, SentimentOverloaded):
+        await run_in_threadpool(db.rollback)
+        raise
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.error(f"Error creating comment: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("", response_model=CommentPage)
+def get_comments(
+    post_id: int = Query(...),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        query = comments.comments_page_query(db.get_bind().dialect.name, post_id, limit, cursor)
+        page = comments.comments_page(crud.row_dicts(db.execute(query)), limit)
+        
+        logger.info(f"Retrieved {len(page['items'])} comments for post {post_id}")
+        return crud.rows_response(page)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching comments for post {post_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/sentiment", response_model=PostCommentSentiment)
+def get_thread_sentiment(post_id: int = Query(...), db: Session = Depends(get_read_db)):
+    try:
+        row = db.execute(comments.thread_sentiment_query(post_id)).mappings().first()
+        
+        if not row:
+            raise HTTPException(status_code=404, detail="Post not found")
+        
+        return crud.rows_response(dict(row))
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching comment sentiment for post {post_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List
 import logging
 
-from database import get_db
-from models import Game, Post
-from schemas import Game as GameSchema
+import crud
+from database import get_read_db
+from response_cache import GAMES_TAG, game_tag, response_cache
+from schemas import Game as GameSchema, GameTrend
 
 logger = logging.getLogger(__name__)
 
@@ -14,35 +14,18 @@ router = APIRouter(prefix="/api/games", tags=["games"])
 
 
 @router.get("", response_model=List[GameSchema])
-def get_games(db: Session = Depends(get_db)):
+def get_games(request: Request, db: Session = Depends(get_read_db)):
+    route = "/api/games"
     try:
-        games_with_sentiment = (
-            db.query(
-                Game,
-                func.avg(Post.sentiment_score).label("avg_sentiment"),
-                func.count(Post.id).label("post_count")
-            )
-            .outerjoin(Post, Game.id == Post.game_id)
-            .group_by(Game.id)
-            .all()
-        )
+        key = response_cache.key(route, [GAMES_TAG])
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
         
-        result = []
-        for game, avg_sentiment, post_count in games_with_sentiment:
-            game_dict = {
-                "id": game.id,
-                "name": game.name,
-                "genre": game.genre,
-                "description": game.description,
-                "image_url": game.image_url,
-                "created_at": game.created_at,
-                "avg_sentiment": float(avg_sentiment) if avg_sentiment else None,
-                "post_count": post_count
-            }
-            result.append(game_dict)
+        rows = crud.row_dicts(db.execute(crud.games_with_stats_query()))
         
-        logger.info(f"Retrieved {len(result)} games")
-        return result
+        logger.info(f"Retrieved {len(rows)} games")
+        return response_cache.store(request, route, key, crud.rows_json(rows), db)
     
     except Exception as e:
         logger.error(f"Error fetching games: {e}")
@@ -50,37 +33,54 @@ def get_games(db: Session = Depends(get_db)):
 
 
 @router.get("/{game_id}", response_model=GameSchema)
-def get_game(game_id: int, db: Session = Depends(get_db)):
+def get_game(game_id: int, request: Request, db: Session = Depends(get_read_db)):
+    route = "/api/games/{game_id}"
     try:
-        game = db.query(Game).filter(Game.id == game_id).first()
+        key = response_cache.key(route, [game_tag(game_id)], game_id=game_id)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
         
-        if not game:
+        row = db.execute(crud.game_with_stats_query(game_id)).mappings().first()
+        
+        if not row:
             raise HTTPException(status_code=404, detail="Game not found")
         
-        sentiment_stats = (
-            db.query(
-                func.avg(Post.sentiment_score).label("avg_sentiment"),
-                func.count(Post.id).label("post_count")
-            )
-            .filter(Post.game_id == game_id)
-            .first()
-        )
+        return response_cache.store(request, route, key, crud.rows_json(dict(row)), db)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching game {game_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{game_id}/trend", response_model=GameTrend)
+def get_game_trend(
+    game_id: int,
+    request: Request,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    days: int = Query(60, ge=1, le=365),
+    db: Session = Depends(get_read_db)
+):
+    route = "/api/games/{game_id}/trend"
+    try:
+        key = response_cache.key(route, [game_tag(game_id)], game_id=game_id, granularity=granularity, days=days)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
         
-        game_dict = {
-            "id": game.id,
-            "name": game.name,
-            "genre": game.genre,
-            "description": game.description,
-            "image_url": game.image_url,
-            "created_at": game.created_at,
-            "avg_sentiment": float(sentiment_stats[0]) if sentiment_stats[0] else None,
-            "post_count": sentiment_stats[1]
-        }
+        since = crud.trend_window_start(granularity, days)
+        rows = db.execute(crud.game_trend_query(game_id, granularity, since)).all()
         
-        return game_dict
+        if not rows:
+            raise HTTPException(status_code=404, detail="Game not found")
+        
+        trend = crud.game_trend(rows, game_id, granularity, since)
+        return response_cache.store(request, route, key, crud.game_trend_json(trend), db)
     
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error fetching game {game_id}: {e}")
+        logger.error(f"Error fetching trend for game {game_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
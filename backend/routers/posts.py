@@ -1,214 +1,229 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
 from typing import List, Optional
 import logging
 import time
 
-from database import get_db
-from models import Post, User, Game
-from schemas import Post as PostSchema, PostCreate
-from sentiment import sentiment_analyzer
-from prometheus_metrics import (
-    sentiment_analysis_total,
-    posts_created_total,
-    game_sentiment_score,
-    sentiment_analysis_duration
-)
+import bulk
+import crud
+import export
+import search
+from database import get_db, get_read_db, read_sessionmaker
+from response_cache import GAMES_TAG, response_cache
+from schemas import BulkPostResponse, GameAnalytics, GamesRanking, Post as PostSchema, PostCreate, PostPage, PostScoringStatus, PostSearchPage
+from scoring import background_scorer, background_scoring_enabled
+from sentiment import SentimentOverloaded, sentiment_analyzer
+from prometheus_metrics import sentiment_analysis_duration
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/posts", tags=["posts"])
 
 
-@router.get("", response_model=List[PostSchema])
+@router.get("", response_model=PostPage)
 def get_posts(
     game_id: Optional[int] = Query(None),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db)
 ):
     try:
-        query = (
-            db.query(Post, User.username, Game.name.label("game_name"))
-            .join(User, Post.user_id == User.id)
-            .join(Game, Post.game_id == Game.id)
-        )
-        
-        if game_id:
-            query = query.filter(Post.game_id == game_id)
-        
-        posts = query.order_by(Post.created_at.desc()).limit(limit).all()
-        
-        result = []
-        for post, username, game_name in posts:
-            post_dict = {
-                "id": post.id,
-                "user_id": post.user_id,
-                "game_id": post.game_id,
-                "title": post.title,
-                "content": post.content,
-                "sentiment_score": post.sentiment_score,
-                "sentiment_label": post.sentiment_label,
-                "confidence": post.confidence,
-                "created_at": post.created_at,
-                "updated_at": post.updated_at,
-                "username": username,
-                "game_name": game_name
-            }
-            result.append(post_dict)
+        query = crud.posts_page_query(db.get_bind().dialect.name, game_id, limit, cursor)
+        page = crud.posts_page(crud.row_dicts(db.execute(query)), limit)
         
-        logger.info(f"Retrieved {len(result)} posts")
-        return result
+        logger.info(f"Retrieved {len(page['items'])} posts")
+        return crud.rows_response(page)
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching posts: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.post("", response_model=PostSchema)
-def create_post(post_data: PostCreate, db: Session = Depends(get_db)):
+async def create_post(post_data: PostCreate, db: Session = Depends(get_db)):
+    # Score on the inference executor first; the session only checks out a
+    # pooled connection on its first query, inside save_post.
     try:
-        game = db.query(Game).filter(Game.id == post_data.game_id).first()
-        if not game:
-            raise HTTPException(status_code=404, detail="Game not found")
-        
-        user = db.query(User).filter(User.username == post_data.username).first()
-        if not user:
-            user = User(username=post_data.username)
-            db.add(user)
-            db.flush()
+        if background_scoring_enabled():
+            post_dict = await run_in_threadpool(crud.save_post, db, post_data, None)
+            background_scorer.notify()
+        else:
+            start_time = time.time()
+            sentiment_result = await sentiment_analyzer.analyze_async(post_data.content)
+            sentiment_analysis_duration.observe(time.time() - start_time)
+            
+            post_dict = await run_in_threadpool(crud.save_post, db, post_data, sentiment_result)
+        
+        logger.info(f"Created post {post_dict['id']} with sentiment: {post_dict['sentiment_label']}")
+        return post_dict
+    
+    except (HTTPException, SentimentOverloaded):
+        await run_in_threadpool(db.rollback)
+        raise
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.error(f"Error creating post: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk", response_model=BulkPostResponse)
+async def create_posts_bulk(request: Request, db: Session = Depends(get_db)):
+    """Create many posts from a JSON array or an NDJSON stream of PostCreate objects."""
+    started = time.perf_counter()
+    try:
+        items = await bulk.read_items(request)
         
-        start_time = time.time()
-        sentiment_result = sentiment_analyzer.analyze(post_data.content)
-        duration = time.time() - start_time
+        if background_scoring_enabled():
+            sentiment_results = None
+        else:
+            sentiment_results = await bulk.score_items(items)
         
-        sentiment_analysis_duration.observe(duration)
-        sentiment_analysis_total.labels(
-            game_name=game.name,
-            sentiment_label=sentiment_result['label']
-        ).inc()
-        posts_created_total.labels(game_name=game.name).inc()
+        results = await run_in_threadpool(bulk.save_posts, db, items, sentiment_results)
+        if background_scoring_enabled():
+            background_scorer.notify()
         
-        new_post = Post(
-            user_id=user.id,
-            game_id=post_data.game_id,
-            title=post_data.title,
-            content=post_data.content,
-            sentiment_score=sentiment_result['sentiment_score'],
-            sentiment_label=sentiment_result['label'],
-            confidence=sentiment_result['confidence']
+        summary = bulk.summarize(results, time.perf_counter() - started)
+        logger.info(
+            f"Bulk created {summary['created']}/{summary['received']} posts "
+            f"({summary['rows_per_second']} rows/s)"
         )
+        return summary
+    
+    except (HTTPException, SentimentOverloaded):
+        await run_in_threadpool(db.rollback)
+        raise
+    except Exception as e:
+        await run_in_threadpool(db.rollback)
+        logger.error(f"Error creating posts in bulk: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/search", response_model=PostSearchPage)
+def search_posts(
+    q: str = Query(..., min_length=1, max_length=200, description="Search terms, matched against title and content"),
+    game_id: Optional[int] = Query(None),
+    label: Optional[str] = Query(None, pattern="^(POSITIVE|NEGATIVE|NEUTRAL|PENDING)$"),
+    sort: str = Query("rank", pattern="^(rank|recent)$"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_read_db)
+):
+    try:
+        query = search.search_query(db.get_bind().dialect.name, q, game_id, label, sort, limit, cursor)
+        rows = crud.row_dicts(db.execute(query))
+        page = search.search_page(rows, limit, sort)
         
-        db.add(new_post)
-        db.commit()
-        db.refresh(new_post)
-        
-        avg_sentiment = (
-            db.query(func.avg(Post.sentiment_score))
-            .filter(Post.game_id == post_data.game_id)
-            .scalar()
+        logger.info(f"Search {q!r} returned {len(page['items'])} posts")
+        return crud.rows_response(page)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/export")
+def export_posts(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    game_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None, description="Only posts created at or after this time (UTC)"),
+    until: Optional[datetime] = Query(None, description="Only posts created before this time (UTC)")
+):
+    """Stream posts with their username and game name as NDJSON or CSV."""
+    try:
+        factory = read_sessionmaker()
+        logger.info(f"Exporting posts as {format} (game_id={game_id}, since={since}, until={until})")
+        return StreamingResponse(
+            export.iter_export(factory, format, game_id=game_id, since=since, until=until),
+            media_type=export.EXPORT_FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="{export.filename(format, game_id)}"'}
         )
-        game_sentiment_score.labels(game_name=game.name).set(float(avg_sentiment or 0))
+    
+    except Exception as e:
+        logger.error(f"Error exporting posts: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{post_id}/status", response_model=PostScoringStatus)
+def get_post_status(post_id: int, db: Session = Depends(get_db)):
+    try:
+        post = db.execute(crud.post_status_query(post_id)).first()
         
-        post_dict = {
-            "id": new_post.id,
-            "user_id": new_post.user_id,
-            "game_id": new_post.game_id,
-            "title": new_post.title,
-            "content": new_post.content,
-            "sentiment_score": new_post.sentiment_score,
-            "sentiment_label": new_post.sentiment_label,
-            "confidence": new_post.confidence,
-            "created_at": new_post.created_at,
-            "updated_at": new_post.updated_at,
-            "username": user.username,
-            "game_name": game.name
-        }
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
         
-        logger.info(f"Created post {new_post.id} with sentiment: {sentiment_result['label']}")
-        return post_dict
+        return crud.post_status_dict(post)
     
     except HTTPException:
-        db.rollback()
         raise
     except Exception as e:
-        db.rollback()
-        logger.error(f"Error creating post: {e}")
+        logger.error(f"Error fetching status for post {post_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/analytics/top-games")
-def get_top_games(limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+def _games_ranking(db, limit: int, min_posts: int = 1, days: Optional[int] = None) -> dict:
+    since = crud.ranking_window_start(days)
+    query = crud.games_ranking_query(db.get_bind().dialect.name, limit, min_posts, since)
+    return crud.games_ranking(db.execute(query).all(), limit, min_posts, since)
+
+
+@router.get("/analytics/games-ranking", response_model=GamesRanking)
+def get_games_ranking(
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    min_posts: int = Query(1, ge=1, description="Only rank games with at least this many scored posts"),
+    days: Optional[int] = Query(None, ge=1, le=365, description="Only count posts from the last N days"),
+    db: Session = Depends(get_read_db)
+):
+    route = "/api/posts/analytics/games-ranking"
     try:
-        top_games = (
-            db.query(
-                Game.id,
-                Game.name,
-                func.avg(Post.sentiment_score).label("avg_sentiment"),
-                func.count(Post.id).label("post_count"),
-                func.sum(case((Post.sentiment_label == 'POSITIVE', 1), else_=0)).label("positive_count"),
-                func.sum(case((Post.sentiment_label == 'NEGATIVE', 1), else_=0)).label("negative_count")
-            )
-            .join(Post, Game.id == Post.game_id)
-            .group_by(Game.id, Game.name)
-            .having(func.count(Post.id) >= 1)  # At least 1 post
-            .order_by(func.avg(Post.sentiment_score).desc())
-            .limit(limit)
-            .all()
-        )
+        key = response_cache.key(route, [GAMES_TAG], limit=limit, min_posts=min_posts, days=days)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
         
-        result = [
-            {
-                "game_id": game_id,
-                "game_name": name,
-                "avg_sentiment": float(avg_sentiment),
-                "post_count": post_count,
-                "positive_count": positive_count,
-                "negative_count": negative_count
-            }
-            for game_id, name, avg_sentiment, post_count, positive_count, negative_count in top_games
-        ]
+        ranking = _games_ranking(db, limit, min_posts, days)
+        return response_cache.store(request, route, key, crud.games_ranking_json(ranking), db)
+    
+    except Exception as e:
+        logger.error(f"Error fetching games ranking: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/top-games", response_model=List[GameAnalytics])
+def get_top_games(request: Request, limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_read_db)):
+    route = "/api/posts/analytics/top-games"
+    try:
+        key = response_cache.key(route, [GAMES_TAG], limit=limit)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
         
-        return result
+        ranking = _games_ranking(db, limit)
+        return response_cache.store(request, route, key, crud.ranked_games_json(ranking["top"]), db)
     
     except Exception as e:
         logger.error(f"Error fetching top games: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.get("/analytics/worst-games")
-def get_worst_games(limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+@router.get("/analytics/worst-games", response_model=List[GameAnalytics])
+def get_worst_games(request: Request, limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_read_db)):
+    route = "/api/posts/analytics/worst-games"
     try:
-        worst_games = (
-            db.query(
-                Game.id,
-                Game.name,
-                func.avg(Post.sentiment_score).label("avg_sentiment"),
-                func.count(Post.id).label("post_count"),
-                func.sum(case((Post.sentiment_label == 'POSITIVE', 1), else_=0)).label("positive_count"),
-                func.sum(case((Post.sentiment_label == 'NEGATIVE', 1), else_=0)).label("negative_count")
-            )
-            .join(Post, Game.id == Post.game_id)
-            .group_by(Game.id, Game.name)
-            .having(func.count(Post.id) >= 1)
-            .order_by(func.avg(Post.sentiment_score).asc())
-            .limit(limit)
-            .all()
-        )
-        
-        result = [
-            {
-                "game_id": game_id,
-                "game_name": name,
-                "avg_sentiment": float(avg_sentiment),
-                "post_count": post_count,
-                "positive_count": positive_count,
-                "negative_count": negative_count
-            }
-            for game_id, name, avg_sentiment, post_count, positive_count, negative_count in worst_games
-        ]
+        key = response_cache.key(route, [GAMES_TAG], limit=limit)
+        cached = response_cache.lookup(request, route, key)
+        if cached is not None:
+            return cached
         
-        return result
+        ranking = _games_ranking(db, limit)
+        return response_cache.store(request, route, key, crud.ranked_games_json(ranking["bottom"]), db)
     
     except Exception as e:
         logger.error(f"Error fetching worst games: {e}")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class GameBase(BaseModel):
@@ -63,6 +63,46 @@ class Post(PostBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class PostPage(BaseModel):
+    items: List[Post]
+    next_cursor: Optional[str] = None
+
+
+class PostSearchHit(Post):
+    rank: float
+
+
+class PostSearchPage(BaseModel):
+    items: List[PostSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class BulkPostResult(BaseModel):
+    index: int
+    status: str
+    post_id: Optional[int] = None
+    sentiment_label: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    error: Optional[str] = None
+
+
+class BulkPostResponse(BaseModel):
+    received: int
+    created: int
+    failed: int
+    elapsed_seconds: float
+    rows_per_second: Optional[float] = None
+    results: List[BulkPostResult]
+
+
+class PostScoringStatus(BaseModel):
+    post_id: int
+    scoring_status: str
+    sentiment_label: Optional[str] = None
+    sentiment_score: Optional[float] = None
+    confidence: Optional[float] = None
+
+
 class CommentBase(BaseModel):
     content: str
 
@@ -84,6 +124,21 @@ class Comment(CommentBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class CommentPage(BaseModel):
+    items: List[Comment]
+    next_cursor: Optional[str] = None
+
+
+class PostCommentSentiment(BaseModel):
+    post_id: int
+    comment_count: int
+    scored_count: int
+    avg_sentiment: Optional[float] = None
+    positive_count: int
+    negative_count: int
+    neutral_count: int
+
+
 class GameAnalytics(BaseModel):
     game_id: int
     game_name: str
@@ -94,3 +149,26 @@ class GameAnalytics(BaseModel):
     neutral_count: int
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class GamesRanking(BaseModel):
+    top: List[GameAnalytics]
+    bottom: List[GameAnalytics]
+    min_posts: int
+    window_start: Optional[datetime] = None
+
+
+class TrendPoint(BaseModel):
+    bucket_start: datetime
+    post_count: int
+    avg_sentiment: Optional[float] = None
+    positive_count: int
+    negative_count: int
+    neutral_count: int
+
+
+class GameTrend(BaseModel):
+    game_id: int
+    granularity: str
+    window_start: datetime
+    points: List[TrendPoint]
@@ -0,0 +1,308 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, or_, select, update
+import logging
+import os
+import threading
+
+from aggregates import (
+    add_post,
+    add_rollup,
+    apply_comment_stats_deltas,
+    apply_rollup_deltas,
+    apply_stats_deltas,
+    empty_delta
+)
+from database import SessionLocal, engine
+from models import Comment, Game, Post
+from prometheus_metrics import (
+    sentiment_analysis_total,
+    game_label,
+    game_sentiment_mean,
+    sentiment_scoring_backlog,
+    comment_scoring_backlog
+)
+from response_cache import response_cache
+from sentiment import sentiment_analyzer
+
+logger = logging.getLogger(__name__)
+
+PENDING_LABEL = "PENDING"
+
+SCORING_MODE = os.getenv("SENTIMENT_SCORING_MODE", "inline").lower()
+SCORING_WORKERS = int(os.getenv("SENTIMENT_SCORING_WORKERS", "2"))
+SCORING_BATCH_SIZE = int(os.getenv("SENTIMENT_SCORING_BATCH_SIZE", "64"))
+SCORING_POLL_SECONDS = float(os.getenv("SENTIMENT_SCORING_POLL_SECONDS", "1.0"))
+# How long a claimed row stays reserved for its worker before another may
+# take it over (the claiming worker died or is stuck).
+SCORING_CLAIM_SECONDS = float(os.getenv("SENTIMENT_SCORING_CLAIM_SECONDS", "300"))
+
+
+def background_scoring_enabled() -> bool:
+    return SCORING_MODE == "background"
+
+
+class BackgroundScorer:
+    """Drains posts and comments saved with a PENDING label and writes their scores back.
+
+    Each worker claims a batch of pending rows by stamping
+    ``scoring_claimed_at`` in a short transaction (selected with
+    ``FOR UPDATE SKIP LOCKED``, so several workers, or several API
+    processes, never claim the same row) and commits before scoring the
+    texts through the shared batching engine. A second short transaction
+    then applies the results with one bulk UPDATE, only to rows still
+    PENDING under that claim, together with the stats deltas. Claims
+    expire after ``SENTIMENT_SCORING_CLAIM_SECONDS``. Workers sleep between
+    polls unless ``notify()`` reports new posts.
+    """
+
+    def __init__(self, workers=SCORING_WORKERS, batch_size=SCORING_BATCH_SIZE,
+                 poll_seconds=SCORING_POLL_SECONDS):
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        if self._threads:
+            return
+        if self.workers > 1 and engine.dialect.name != "postgresql":
+            # Without SKIP LOCKED, parallel workers would claim (and score)
+            # the same rows twice.
+            logger.warning(f"{engine.dialect.name} has no row-level claims; using one scoring worker")
+            self.workers = 1
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._loop, name=f"sentiment-scorer-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info(f"Background sentiment scoring started with {self.workers} workers")
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            scored = 0
+            for score in (self.score_pending, self.score_pending_comments):
+                try:
+                    scored = max(scored, score())
+                except Exception as e:
+                    logger.error(f"Background scoring failed: {e}")
+
+            if scored < self.batch_size:
+                self._wakeup.wait(self.poll_seconds)
+                self._wakeup.clear()
+
+    def _claim(self, model, query):
+        """Stamp up to ``batch_size`` claimable pending rows of ``model`` and return them.
+
+        Runs in its own short transaction, so no row lock or connection is
+        held while the texts are scored. Returns the claim token (the stamp
+        written to ``scoring_claimed_at``) and ``query``'s rows for the
+        claimed ids.
+        """
+        db = SessionLocal()
+        try:
+            token = datetime.now(timezone.utc)
+            ids = db.execute(
+                select(model.id)
+                .where(
+                    model.sentiment_label == PENDING_LABEL,
+                    or_(
+                        model.scoring_claimed_at.is_(None),
+                        model.scoring_claimed_at < token - timedelta(seconds=SCORING_CLAIM_SECONDS)
+                    )
+                )
+                .order_by(model.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+
+            rows = []
+            if ids:
+                db.execute(update(model).where(model.id.in_(ids)).values(scoring_claimed_at=token))
+                rows = db.execute(query.where(model.id.in_(ids)).order_by(model.id)).all()
+            db.commit()
+            return token, rows
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    @staticmethod
+    def _still_claimed(db, model, token, ids) -> set:
+        """Lock and return the ids that are still PENDING under this claim.
+
+        A row whose claim expired and was taken over by another worker, or
+        that was scored some other way meanwhile, is left alone.
+        """
+        if not ids:
+            return set()
+        return set(db.execute(
+            select(model.id)
+            .where(
+                model.id.in_(ids),
+                model.sentiment_label == PENDING_LABEL,
+                model.scoring_claimed_at == token
+            )
+            .with_for_update()
+        ).scalars())
+
+    @staticmethod
+    def _release(db, model, token, ids):
+        # Failed rows go back to the pool right away instead of waiting
+        # for their claim to expire.
+        if ids:
+            db.execute(
+                update(model)
+                .where(model.id.in_(ids), model.scoring_claimed_at == token)
+                .values(scoring_claimed_at=None)
+                .execution_options(synchronize_session=False)
+            )
+
+    def score_pending(self) -> int:
+        """Claim, score and update one batch of pending posts."""
+        token, rows = self._claim(
+            Post,
+            select(Post.id, Post.game_id, Post.content, Post.created_at, Game.name, Game.genre)
+            .join(Game, Post.game_id == Game.id)
+        )
+
+        if not rows:
+            sentiment_scoring_backlog.set(0)
+            return 0
+
+        futures = [sentiment_analyzer.submit(content) for _, _, content, _, _, _ in rows]
+
+        results = []
+        failed = []
+        for row, future in zip(rows, futures):
+            try:
+                results.append((row, future.result()))
+            except Exception as e:
+                # Released below; it is retried on the next poll.
+                logger.error(f"Scoring post {row.id} failed: {e}")
+                failed.append(row.id)
+
+        db = SessionLocal()
+        try:
+            claimed = self._still_claimed(db, Post, token, [row.id for row, _ in results])
+
+            updates = []
+            scored = []
+            deltas = {}
+            rollups = {}
+            for (post_id, game_id, _, created_at, name, genre), result in results:
+                if post_id not in claimed:
+                    logger.warning(f"Dropping score for post {post_id}: its claim was lost")
+                    continue
+
+                updates.append({
+                    "id": post_id,
+                    "sentiment_score": result['sentiment_score'],
+                    "sentiment_label": result['label'],
+                    "confidence": result['confidence'],
+                    "scoring_claimed_at": None
+                })
+                game_name = game_label(game_id, name, genre)
+                scored.append((game_name, result['sentiment_score']))
+                add_post(deltas.setdefault(game_id, empty_delta()), result, new_post=False)
+                add_rollup(rollups, game_id, created_at, result)
+                sentiment_analysis_total.labels(
+                    game_name=game_name,
+                    sentiment_label=result['label']
+                ).inc()
+
+            if updates:
+                db.execute(update(Post), updates)
+                apply_stats_deltas(db, deltas)
+                apply_rollup_deltas(db, rollups)
+            self._release(db, Post, token, failed)
+            db.commit()
+            response_cache.invalidate_games(deltas)
+
+            for game_name, score in scored:
+                game_sentiment_mean.observe(game_name, score)
+
+            backlog = db.query(func.count(Post.id)).filter(Post.sentiment_label == PENDING_LABEL).scalar()
+            sentiment_scoring_backlog.set(backlog)
+
+            logger.info(f"Scored {len(updates)} pending posts ({backlog} still pending)")
+            return len(updates)
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def score_pending_comments(self) -> int:
+        """Claim, score and update one batch of pending comments."""
+        token, rows = self._claim(Comment, select(Comment.id, Comment.post_id, Comment.content))
+
+        if not rows:
+            comment_scoring_backlog.set(0)
+            return 0
+
+        futures = [sentiment_analyzer.submit(content) for _, _, content in rows]
+
+        results = []
+        failed = []
+        for row, future in zip(rows, futures):
+            try:
+                results.append((row, future.result()))
+            except Exception as e:
+                logger.error(f"Scoring comment {row.id} failed: {e}")
+                failed.append(row.id)
+
+        db = SessionLocal()
+        try:
+            claimed = self._still_claimed(db, Comment, token, [row.id for row, _ in results])
+
+            updates = []
+            deltas = {}
+            for (comment_id, post_id, _), result in results:
+                if comment_id not in claimed:
+                    logger.warning(f"Dropping score for comment {comment_id}: its claim was lost")
+                    continue
+
+                updates.append({
+                    "id": comment_id,
+                    "sentiment_score": result['sentiment_score'],
+                    "sentiment_label": result['label'],
+                    "scoring_claimed_at": None
+                })
+                add_post(deltas.setdefault(post_id, empty_delta()), result, new_post=False)
+
+            if updates:
+                db.execute(update(Comment), updates)
+                apply_comment_stats_deltas(db, deltas)
+            self._release(db, Comment, token, failed)
+            db.commit()
+
+            backlog = db.query(func.count(Comment.id)).filter(Comment.sentiment_label == PENDING_LABEL).scalar()
+            comment_scoring_backlog.set(backlog)
+
+            logger.info(f"Scored {len(updates)} pending comments ({backlog} still pending)")
+            return len(updates)
+
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+background_scorer = BackgroundScorer()
@@ -0,0 +1,181 @@
+"""
+Full-text search over post titles and content for ``GET /api/posts/search``.
+
+PostgreSQL keeps a generated ``posts.search_vector`` tsvector (title
+weighted above content) behind a GIN index and ranks with ``ts_rank_cd``.
+SQLite, for local runs, gets an external-content FTS5 table ``posts_fts``
+kept in sync by triggers and ranks with ``bm25``. Both are created by
+``install_search_index``. On PostgreSQL that is a deploy step
+(``migrate.py``; fresh databases get it from init.sql), because adding the
+generated column rewrites ``posts``; app startup only runs
+``check_search_index``.
+
+Results are ordered by rank (or newest first) and paged with a keyset on
+``(rank, id)``. bm25 depends on corpus statistics, so on SQLite a page can
+shift if posts are written between requests; ``ts_rank_cd`` does not.
+"""
+
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import Float, cast, column, func, literal_column, select, table, text, tuple_
+from typing import Optional
+import logging
+
+from crud import POST_COLUMNS
+from models import Game, Post, User
+from pagination import decode_cursor, encode_cursor, keyset_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Text search configuration for stemming and stop words. It is baked into
+# the generated column, so changing it means rebuilding search_vector.
+SEARCH_TEXT_CONFIG = "english"
+
+# bm25 column weights for (title, content), roughly ts_rank's A/B ratio.
+FTS5_WEIGHTS = (2.5, 1.0)
+
+# Adding a stored generated column rewrites the table under an exclusive
+# lock; run it in a maintenance window on a large existing table.
+POSTGRES_COLUMN_DDL = (
+    "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(title, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_TEXT_CONFIG}', coalesce(content, '')), 'B')) STORED"
+)
+
+POSTGRES_INDEX_DDL = "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_posts_search ON posts USING GIN (search_vector)"
+
+# NULL when the index does not exist, false while (or after a failed)
+# concurrent build.
+POSTGRES_INDEX_VALID = (
+    "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+    "WHERE c.relname = 'idx_posts_search'"
+)
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+    "title, content, content='posts', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN "
+    "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END",
+    # Only text edits touch the index; score write-backs do not.
+    "CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN "
+    "INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+    "INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content); END",
+)
+
+posts_fts = table("posts_fts", column("rowid"))
+search_vector = literal_column("posts.search_vector")
+
+
+def install_search_index(engine):
+    """Create the search column and index (PostgreSQL) or FTS5 table (SQLite).
+
+    Idempotent. The GIN index is built ``CONCURRENTLY`` so writes carry on
+    meanwhile; an invalid index left by an interrupted build is rebuilt.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            conn.execute(text(POSTGRES_COLUMN_DDL))
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block.
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if conn.execute(text(POSTGRES_INDEX_VALID)).scalar() is False:
+                conn.execute(text("DROP INDEX CONCURRENTLY idx_posts_search"))
+            conn.execute(text(POSTGRES_INDEX_DDL))
+    elif dialect == "sqlite":
+        with engine.begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'")).first()
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            if not exists:
+                # Index the posts written before the triggers existed.
+                conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+                logger.info("Built posts_fts full-text index")
+    else:
+        logger.warning(f"Full-text search is not available on {dialect}")
+
+
+def check_search_index(engine):
+    """Startup hook: never runs PostgreSQL DDL, only reports a missing index.
+
+    SQLite databases are local ones, so their FTS5 table is still created
+    here.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.connect() as conn:
+            valid = conn.execute(text(POSTGRES_INDEX_VALID)).scalar()
+        if not valid:
+            logger.warning("Search index idx_posts_search is missing or invalid; run migrate.py")
+    else:
+        install_search_index(engine)
+
+
+def fts5_query(q: str) -> str:
+    """Quote each term so user input is never parsed as FTS5 syntax (terms are ANDed)."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def search_query(dialect: str, q: str, game_id: Optional[int] = None, label: Optional[str] = None,
+                 sort: str = "rank", limit: int = 20, cursor: Optional[str] = None):
+    """Matching posts with a ``rank`` column; fetches one extra row to detect a next page."""
+    if not q.strip():
+        raise HTTPException(status_code=422, detail="q must contain at least one search term")
+
+    query = select(*POST_COLUMNS)
+
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery(literal_column(f"'{SEARCH_TEXT_CONFIG}'::regconfig"), q)
+        # ts_rank_cd returns real; compared with the float8 cursor value a
+        # float4 rank almost never tests equal, so ties at a page boundary
+        # would be skipped or repeated. Keyset on the exact double instead.
+        rank = cast(func.ts_rank_cd(search_vector, tsquery), Float(53))
+        query = query.where(search_vector.op("@@")(tsquery))
+    elif dialect == "sqlite":
+        rank = -func.bm25(literal_column("posts_fts"), *FTS5_WEIGHTS)
+        query = (
+            query.join(posts_fts, posts_fts.c.rowid == Post.id)
+            .where(literal_column("posts_fts").op("MATCH")(fts5_query(q)))
+        )
+    else:
+        raise HTTPException(status_code=501, detail=f"Search is not supported on {dialect}")
+
+    query = (
+        query.add_columns(rank.label("rank"))
+        .join(User, Post.user_id == User.id)
+        .join(Game, Post.game_id == Game.id)
+    )
+
+    if game_id:
+        query = query.where(Post.game_id == game_id)
+    if label:
+        query = query.where(Post.sentiment_label == label)
+
+    if sort == "recent":
+        sort_key = keyset_timestamp(Post.created_at, dialect)
+        if cursor:
+            created_at, post_id = decode_cursor(cursor, datetime, int)
+            query = query.where(
+                tuple_(sort_key, Post.id) < tuple_(keyset_timestamp(Post.created_at, dialect, created_at), post_id)
+            )
+    else:
+        sort_key = rank
+        if cursor:
+            last_rank, post_id = decode_cursor(cursor, float, int)
+            query = query.where((rank < last_rank) | ((rank == last_rank) & (Post.id < post_id)))
+
+    return query.order_by(sort_key.desc(), Post.id.desc()).limit(limit + 1)
+
+
+def search_page(rows: list, limit: int, sort: str = "rank") -> dict:
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        sort_value = last["created_at"] if sort == "recent" else last["rank"]
+        next_cursor = encode_cursor(sort_value, last["id"])
+
+    return {"items": rows, "next_cursor": next_cursor}
@@ -1,67 +1,602 @@
-from transformers import pipeline
+from concurrent.futures import Future
+from contextlib import contextmanager
+import asyncio
+import hashlib
 import logging
+import os
+import queue
+import random
+import threading
+import time
+import unicodedata
+
+from cache import build_cache
+from profiling import inference_profiler
+from prometheus_metrics import (
+    sentiment_batch_size,
+    sentiment_queue_wait,
+    sentiment_stage_duration,
+    sentiment_cache_hits_total,
+    sentiment_cache_misses_total
+)
 
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+
+BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("SENTIMENT_BATCH_MAX_WAIT_MS", "10"))
+QUEUE_MAXSIZE = int(os.getenv("SENTIMENT_QUEUE_MAXSIZE", "1024"))
+INFERENCE_WORKERS = int(os.getenv("SENTIMENT_INFERENCE_WORKERS", "1"))
+TORCH_THREADS = int(os.getenv("SENTIMENT_TORCH_THREADS", "0"))
+INFERENCE_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch").lower()
+ONNX_PATH = os.getenv("SENTIMENT_ONNX_PATH", "/tmp/sentiment-onnx")
+WARMUP_BATCHES = int(os.getenv("SENTIMENT_WARMUP_BATCHES", "2"))
+MAX_TOKENS = int(os.getenv("SENTIMENT_MAX_TOKENS", "0"))
+CHUNK_LONG_TEXT = os.getenv("SENTIMENT_CHUNK_LONG_TEXT", "false").lower() in ("1", "true", "yes")
+CHUNK_STRIDE = int(os.getenv("SENTIMENT_CHUNK_STRIDE", "64"))
+MAX_CHUNKS = int(os.getenv("SENTIMENT_MAX_CHUNKS", "8"))
+
+CACHE_BACKEND = os.getenv("SENTIMENT_CACHE_BACKEND", "memory")
+CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+CACHE_TTL_SECONDS = float(os.getenv("SENTIMENT_CACHE_TTL_SECONDS", "0"))
+CACHE_PATH = os.getenv("SENTIMENT_CACHE_PATH")
+
+# Fraction of scored texts logged at INFO; the rest only log at DEBUG.
+LOG_SAMPLE_RATE = float(os.getenv("SENTIMENT_LOG_SAMPLE_RATE", "0"))
+
+NEUTRAL_RESULT = {
+    'label': 'NEUTRAL',
+    'confidence': 0.0,
+    'sentiment_score': 0.0
+}
+
+
+class SentimentOverloaded(RuntimeError):
+    """The batching queue is full; callers should shed the request, not fake a score."""
+
+
+class BatchingEngine:
+    """Collects texts from concurrent callers and scores them in padded batches.
+
+    Each worker thread takes up to ``batch_size`` queued texts, waiting at
+    most ``max_wait_ms`` after the first one arrives, and hands them to
+    ``run_batch`` in one call. Every caller gets its own ``Future``, so the
+    workers double as the dedicated inference executor: request threads and
+    the event loop only ever wait on futures.
+    """
+
+    def __init__(self, run_batch, batch_size=BATCH_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS,
+                 queue_maxsize=QUEUE_MAXSIZE, workers=INFERENCE_WORKERS):
+        self._run_batch = run_batch
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.workers = max(1, workers)
+        self._queue = queue.Queue(maxsize=max(0, queue_maxsize))
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future = Future()
+        try:
+            self._queue.put_nowait((text, future, time.perf_counter()))
+        except queue.Full:
+            future.set_exception(
+                SentimentOverloaded(f"Sentiment queue is full ({self._queue.maxsize} pending texts)")
+            )
+        return future
+
+    def close(self):
+        with self._lock:
+            if not self._threads:
+                return
+            self._queue.put(None)
+            for thread in self._threads:
+                thread.join(timeout=5)
+            self._threads = []
+            # Drop the shutdown marker the last worker passed along and fail
+            # anything that was queued behind it.
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None and item[1].set_running_or_notify_cancel():
+                    item[1].set_exception(RuntimeError("Sentiment engine is shut down"))
+
+    def _ensure_worker(self):
+        if self._threads and all(thread.is_alive() for thread in self._threads):
+            return
+        with self._lock:
+            # Replace any worker that has died so queued texts never wait
+            # on a thread that is gone.
+            alive = {thread.name: thread for thread in self._threads if thread.is_alive()}
+            self._threads = []
+            for i in range(self.workers):
+                name = f"sentiment-batcher-{i}"
+                thread = alive.get(name)
+                if thread is None:
+                    thread = threading.Thread(target=self._loop, name=name, daemon=True)
+                    thread.start()
+                self._threads.append(thread)
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                # Pass the shutdown marker on to the next worker.
+                self._queue.put(None)
+                return
+            batch = [first]
+            try:
+                batch = self._collect(first)
+                self._score(batch)
+            except Exception as e:
+                # Never let one bad batch end the worker; fail whatever it
+                # had claimed so those callers do not wait forever.
+                logger.error(f"Sentiment batch worker error: {e}")
+                for _, future, _ in batch:
+                    if future.running():
+                        future.set_exception(e)
+
+    def _score(self, batch: list):
+        # Claiming a future makes it uncancellable, so setting its outcome
+        # below cannot fail; callers that gave up while queued are dropped.
+        batch = [item for item in batch if item[1].set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            sentiment_queue_wait.observe(started - enqueued_at)
+        sentiment_batch_size.observe(len(batch))
+
+        try:
+            results = self._run_batch([text for text, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+def model_config_id(backend: str = INFERENCE_BACKEND) -> str:
+    """Identifies everything that changes a score, for result cache keys."""
+    return (
+        f"{MODEL_NAME}:{backend}:{MAX_TOKENS or 'max'}"
+        + (f":chunked/{CHUNK_STRIDE}/{MAX_CHUNKS}" if CHUNK_LONG_TEXT else "")
+    )
+
+
+def load_pipeline(backend: str = INFERENCE_BACKEND):
+    """Build the text-classification pipeline for an inference backend.
+
+    ``torch`` is the stock fp32 model, ``torch-int8`` applies dynamic int8
+    quantization to its Linear layers, and ``onnx`` runs an exported graph
+    on ONNX Runtime (requires ``optimum[onnxruntime]``). The ONNX export is
+    written to ``SENTIMENT_ONNX_PATH`` on first use and reloaded after that.
+
+    torch and transformers are imported here rather than at module level so
+    importing the app (or tooling that never scores text) stays cheap.
+    """
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    if backend == "torch":
+        return pipeline("sentiment-analysis", model=MODEL_NAME, device=-1)
+
+    tokenizer = AutoTokenizer.from_pretrained(MODEL_NAME)
+
+    if backend == "torch-int8":
+        model = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME)
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer, device=-1)
+
+    if backend == "onnx":
+        try:
+            import onnxruntime
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            from optimum.pipelines import pipeline as ort_pipeline
+        except ImportError as e:
+            raise RuntimeError("SENTIMENT_BACKEND=onnx requires the optimum[onnxruntime] package") from e
+
+        session_options = onnxruntime.SessionOptions()
+        if TORCH_THREADS > 0:
+            session_options.intra_op_num_threads = TORCH_THREADS
+
+        exported = os.path.isfile(os.path.join(ONNX_PATH, "model.onnx"))
+        model = ORTModelForSequenceClassification.from_pretrained(
+            ONNX_PATH if exported else MODEL_NAME,
+            export=not exported,
+            session_options=session_options
+        )
+        if not exported:
+            model.save_pretrained(ONNX_PATH)
+            tokenizer.save_pretrained(ONNX_PATH)
+            logger.info(f"Exported ONNX sentiment model to {ONNX_PATH}")
+        return ort_pipeline("text-classification", model=model, tokenizer=tokenizer, accelerator="ort")
+
+    raise ValueError(f"Unknown sentiment backend: {backend}")
+
+
+_STAGE_DURATIONS = {
+    stage: sentiment_stage_duration.labels(stage=stage)
+    for stage in ("tokenize", "forward", "postprocess")
+}
+
+
+@contextmanager
+def scoring_stage(stage: str):
+    """Time one scoring stage and mark it as a ``sentiment.<stage>`` profiler range."""
+    from torch.profiler import record_function
+
+    started = time.perf_counter()
+    with record_function(f"sentiment.{stage}"):
+        yield
+    _STAGE_DURATIONS[stage].observe(time.perf_counter() - started)
+
+
+class SentimentModel:
+    """A loaded classifier for one inference backend.
+
+    Owns the pipeline and everything that depends on it (token limits,
+    long-post windowing, label mapping). ``SentimentAnalyzer`` wraps a
+    single instance; benchmarks build one per backend.
+    """
+
+    def __init__(self, backend: str = INFERENCE_BACKEND):
+        self.backend = backend
+        self.pipeline = load_pipeline(backend)
+        self.max_tokens = self._resolve_max_tokens()
+        self.model_id = model_config_id(backend)
+
+    def _resolve_max_tokens(self) -> int:
+        """Longest input (special tokens included) the model accepts."""
+        limit = self.pipeline.tokenizer.model_max_length
+        if not limit or limit > 100_000:
+            # Tokenizer config has no limit; RoBERTa reserves two positions.
+            limit = self.pipeline.model.config.max_position_embeddings - 2
+        return min(limit, MAX_TOKENS) if MAX_TOKENS > 0 else limit
+
+    def _split_windows(self, texts: list) -> list:
+        """Split each text into overlapping token windows that fit the model.
+
+        Returns one list of ``(window_text, token_count)`` per input text.
+        Texts that already fit are passed through untouched.
+        """
+        tokenizer = self.pipeline.tokenizer
+        window = self.max_tokens - tokenizer.num_special_tokens_to_add()
+        step = max(1, window - CHUNK_STRIDE)
+        encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+
+        pieces = []
+        for text, ids in zip(texts, encoded):
+            if len(ids) <= window:
+                pieces.append([(text, max(1, len(ids)))])
+                continue
+            starts = list(range(0, len(ids) - window + step, step))[:MAX_CHUNKS]
+            pieces.append([
+                (tokenizer.decode(ids[start:start + window]), len(ids[start:start + window]))
+                for start in starts
+            ])
+        return pieces
+
+    def score_batch(self, texts: list) -> list:
+        """Score ``texts`` in one padded batch, timing each stage.
+
+        The tokenizer and model are called directly rather than through
+        the pipeline so tokenization, the forward pass and label mapping
+        are observed separately in ``sentiment_stage_duration_seconds``
+        and show up as named ranges in profiler traces.
+        """
+        import torch
+
+        with scoring_stage("tokenize"):
+            if CHUNK_LONG_TEXT:
+                pieces = self._split_windows(texts)
+            else:
+                pieces = [[(text, 1)] for text in texts]
+            # Truncation is token-based and padding only goes to the longest
+            # window in this batch.
+            encoded = self.pipeline.tokenizer(
+                [window for windows in pieces for window, _ in windows],
+                padding=True,
+                truncation=True,
+                max_length=self.max_tokens,
+                return_tensors="pt"
+            )
+
+        with scoring_stage("forward"), torch.inference_mode():
+            logits = self.pipeline.model(**encoded).logits
+
+        with scoring_stage("postprocess"):
+            probabilities = logits.softmax(dim=-1).tolist()
+            id2label = self.pipeline.model.config.id2label
+
+            results = []
+            position = 0
+            for windows in pieces:
+                scores = [0.0] * len(probabilities[position])
+                total_weight = 0
+                for _, weight in windows:
+                    for index, probability in enumerate(probabilities[position]):
+                        scores[index] += probability * weight
+                    total_weight += weight
+                    position += 1
+                best = max(range(len(scores)), key=scores.__getitem__)
+                results.append(self._to_sentiment({'label': id2label[best], 'score': scores[best] / total_weight}))
+        return results
+
+    @staticmethod
+    def _to_sentiment(result: dict) -> dict:
+        raw_label = result['label'].lower()
+        confidence = result['score']
+        if raw_label == 'positive':
+            label = 'POSITIVE'
+            sentiment_score = confidence
+        elif raw_label == 'negative':
+            label = 'NEGATIVE'
+            sentiment_score = -confidence
+        elif raw_label == 'neutral':
+            label = 'NEUTRAL'
+            sentiment_score = 0.0
+        else:
+            logger.warning(f"Unexpected label: {raw_label}")
+            label = 'NEUTRAL'
+            sentiment_score = 0.0
+
+        return {
+            'label': label,
+            'confidence': confidence,
+            'sentiment_score': sentiment_score
+        }
+
+
 class SentimentAnalyzer:
-    
+    """Process-wide entry point for sentiment scoring.
+
+    Constructing it is cheap: the model is loaded on a background thread,
+    started either by ``start_loading()`` at app startup or by the first
+    text submitted. Texts submitted before the model is ready wait in the
+    batching queue and are scored once warm-up has finished.
+    """
+
     _instance = None
-    _analyzer = None
-    
+    _model = None
+    _preloaded = None
+    _engine = None
+    _cache = None
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SentimentAnalyzer, cls).__new__(cls)
             cls._instance._initialize()
         return cls._instance
-    
+
     def _initialize(self):
+        self._model_id = model_config_id(INFERENCE_BACKEND)
+        self._load_lock = threading.Lock()
+        self._load_thread = None
+        self._load_done = threading.Event()
+        self._load_error = None
+        self._engine = BatchingEngine(self._run_batch)
+        self._cache = build_cache(
+            CACHE_BACKEND,
+            maxsize=CACHE_SIZE,
+            ttl=CACHE_TTL_SECONDS,
+            path=CACHE_PATH,
+            table="sentiment_results"
+        )
+
+    @property
+    def is_ready(self) -> bool:
+        """True once the model is loaded and warm-up batches have run."""
+        return self._model is not None
+
+    @property
+    def status(self) -> dict:
+        if self._model is not None:
+            state = "ready"
+        elif self._load_thread is not None and self._load_thread.is_alive():
+            state = "loading"
+        elif self._load_error is not None:
+            state = "failed"
+        else:
+            state = "not_loaded"
+        return {
+            "state": state,
+            "backend": INFERENCE_BACKEND,
+            "error": self._load_error
+        }
+
+    def start_loading(self):
+        """Start loading the model in the background if it is not loaded yet."""
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None or (self._load_thread is not None and self._load_thread.is_alive()):
+                return
+            self._load_done.clear()
+            self._load_thread = threading.Thread(target=self._load, name="sentiment-loader", daemon=True)
+            self._load_thread.start()
+
+    def preload(self):
+        """Load the model weights in this process without warming them up.
+
+        Meant for a pre-fork server master: workers forked afterwards share
+        the weights copy-on-write and only run their own warm-up batches
+        when ``start_loading()`` is called. No forward pass runs here, so
+        torch's intra-op thread pool is not started before the fork.
+        """
+        if self._model is None and self._preloaded is None:
+            logger.info(f"Preloading Twitter-RoBERTa sentiment model ({INFERENCE_BACKEND} backend)...")
+            self._preloaded = SentimentModel(INFERENCE_BACKEND)
+
+    def _load(self):
         try:
-            logger.info("Loading Twitter-RoBERTa sentiment model...")
-            self._analyzer = pipeline(
-                "sentiment-analysis",
-                model="cardiffnlp/twitter-roberta-base-sentiment-latest",
-                device=-1
-            )
+            if TORCH_THREADS > 0:
+                import torch
+                torch.set_num_threads(TORCH_THREADS)
+            if self._preloaded is not None:
+                model = self._preloaded
+            else:
+                logger.info(f"Loading Twitter-RoBERTa sentiment model ({INFERENCE_BACKEND} backend)...")
+                model = SentimentModel(INFERENCE_BACKEND)
+
+            for _ in range(WARMUP_BATCHES):
+                model.score_batch(["Warming up the sentiment model."] * self._engine.batch_size)
+
+            self._model = model
+            self._load_error = None
             logger.info("✓ Twitter-RoBERTa model loaded successfully")
         except Exception as e:
+            self._load_error = str(e)
             logger.error(f"Failed to load sentiment model: {e}")
-            raise
-    
+        finally:
+            self._load_done.set()
+
+    def _run_batch(self, texts: list) -> list:
+        if self._model is None:
+            self.start_loading()
+            self._load_done.wait()
+            if self._model is None:
+                raise RuntimeError(f"Sentiment model failed to load: {self._load_error}")
+        return inference_profiler.run(self._model.score_batch, texts)
+
+    def cache_key(self, text: str) -> str:
+        """Hash of the model configuration and the normalized text.
+
+        The text is not cut to the model window here because truncation is
+        token-based; two texts sharing a character prefix can still differ
+        in what the model sees.
+        """
+        normalized = " ".join(unicodedata.normalize("NFC", text).split())
+        return hashlib.sha256(f"{self._model_id}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def submit(self, text: str) -> Future:
+        """Queue ``text`` for the next inference batch and return its future.
+
+        Texts already in the result cache resolve immediately without
+        touching the queue or waiting for the model to load.
+        """
+        if self._cache is None:
+            return self._engine.submit(text)
+
+        key = self.cache_key(text)
+        cached = self._cache.get(key)
+        if cached is not None:
+            sentiment_cache_hits_total.inc()
+            future = Future()
+            future.set_result(dict(cached))
+            return future
+
+        sentiment_cache_misses_total.inc()
+        future = self._engine.submit(text)
+        future.add_done_callback(lambda done: self._store(key, done))
+        return future
+
+    def _store(self, key: str, future: Future):
+        # exception() raises CancelledError on a cancelled future.
+        if not future.cancelled() and future.exception() is None:
+            self._cache.set(key, dict(future.result()))
+
+    @staticmethod
+    def _log_result(result: dict):
+        # Called for every scored text, so skip formatting the message
+        # unless it is going to be emitted.
+        if LOG_SAMPLE_RATE > 0 and random.random() < LOG_SAMPLE_RATE:
+            level = logging.INFO
+        elif logger.isEnabledFor(logging.DEBUG):
+            level = logging.DEBUG
+        else:
+            return
+        logger.log(
+            level,
+            f"Sentiment: {result['label']} (score: {result['sentiment_score']:.3f}, "
+            f"confidence: {result['confidence']:.3f})"
+        )
+
     def analyze(self, text: str) -> dict:
+        """Score ``text``; NEUTRAL if scoring fails, ``SentimentOverloaded`` if the queue is full."""
         try:
-            text = text[:512]
-            result = self._analyzer(text)[0]
-            raw_label = result['label'].lower()
-            confidence = result['score']
-            if raw_label == 'positive':
-                label = 'POSITIVE'
-                sentiment_score = confidence
-            elif raw_label == 'negative':
-                label = 'NEGATIVE'
-                sentiment_score = -confidence
-            elif raw_label == 'neutral':
-                label = 'NEUTRAL'
-                sentiment_score = 0.0
-            else:
-                logger.warning(f"Unexpected label: {raw_label}")
-                label = 'NEUTRAL'
-                sentiment_score = 0.0
-            
-            logger.info(f"Sentiment: {label} (score: {sentiment_score:.3f}, confidence: {confidence:.3f})")
-            
-            return {
-                'label': label,
-                'confidence': confidence,
-                'sentiment_score': sentiment_score
-            }
-        
+            result = self.submit(text).result()
+            self._log_result(result)
+            return result
+
+        except SentimentOverloaded:
+            raise
+        except Exception as e:
+            logger.error(f"Sentiment analysis failed: {e}")
+            return dict(NEUTRAL_RESULT)
+
+    def analyze_batch(self, texts: list) -> list:
+        """Score several texts; they share inference batches with other callers."""
+        futures = [self.submit(text) for text in texts]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except SentimentOverloaded:
+                raise
+            except Exception as e:
+                logger.error(f"Sentiment analysis failed: {e}")
+                results.append(dict(NEUTRAL_RESULT))
+        return results
+
+    async def analyze_async(self, text: str) -> dict:
+        """Score ``text`` without blocking the event loop or a threadpool worker."""
+        try:
+            result = await asyncio.wrap_future(self.submit(text))
+            self._log_result(result)
+            return result
+
+        except SentimentOverloaded:
+            raise
         except Exception as e:
             logger.error(f"Sentiment analysis failed: {e}")
-            return {
-                'label': 'NEUTRAL',
-                'confidence': 0.0,
-                'sentiment_score': 0.0
-            }
+            return dict(NEUTRAL_RESULT)
+
+    async def analyze_batch_async(self, texts: list, chunk_size: int = max(BATCH_SIZE, QUEUE_MAXSIZE // 2)) -> list:
+        """Score many texts from the event loop.
+
+        Texts are submitted ``chunk_size`` at a time so a large import never
+        overflows the batching queue or starves other callers out of it.
+        """
+        results = []
+        for start in range(0, len(texts), chunk_size):
+            futures = [asyncio.wrap_future(self.submit(text)) for text in texts[start:start + chunk_size]]
+            for outcome in await asyncio.gather(*futures, return_exceptions=True):
+                if isinstance(outcome, SentimentOverloaded):
+                    raise outcome
+                if isinstance(outcome, Exception):
+                    logger.error(f"Sentiment analysis failed: {outcome}")
+                    outcome = dict(NEUTRAL_RESULT)
+                results.append(outcome)
+        return results
+
+    def shutdown(self):
+        if self._engine is not None:
+            self._engine.close()
 
 
 sentiment_analyzer = SentimentAnalyzer()
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+
+import pytest
+
+from sentiment import BatchingEngine
+
+
+def gated_engine(**kwargs):
+    """Engine whose first batch blocks until ``gate`` is set."""
+    gate = threading.Event()
+
+    def run_batch(texts):
+        gate.wait(5)
+        return [text.upper() for text in texts]
+
+    engine = BatchingEngine(run_batch, batch_size=1, max_wait_ms=0, workers=1, **kwargs)
+    return engine, gate
+
+
+def test_cancelled_queued_caller_does_not_kill_worker():
+    engine, gate = gated_engine()
+    try:
+        busy = engine.submit("a")
+        queued = engine.submit("b")
+        assert queued.cancel()
+        gate.set()
+
+        assert busy.result(timeout=5) == "A"
+        assert engine.submit("c").result(timeout=5) == "C"
+        assert all(thread.is_alive() for thread in engine._threads)
+    finally:
+        engine.close()
+
+
+def test_cancelled_async_caller_then_next_text_is_scored():
+    engine, gate = gated_engine()
+
+    async def scenario():
+        busy = asyncio.wrap_future(engine.submit("a"))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(asyncio.wrap_future(engine.submit("b")), timeout=0.05)
+        gate.set()
+        assert await busy == "A"
+        return await asyncio.wait_for(asyncio.wrap_future(engine.submit("c")), timeout=5)
+
+    try:
+        assert asyncio.run(scenario()) == "C"
+    finally:
+        engine.close()
+
+
+def test_caller_cancelled_while_its_batch_runs():
+    engine, gate = gated_engine()
+
+    async def scenario():
+        running = asyncio.ensure_future(asyncio.wrap_future(engine.submit("a")))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        gate.set()
+        return await asyncio.wait_for(asyncio.wrap_future(engine.submit("b")), timeout=5)
+
+    try:
+        assert asyncio.run(scenario()) == "B"
+    finally:
+        engine.close()
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_worker_is_replaced():
+    calls = []
+
+    def run_batch(texts):
+        calls.append(texts)
+        if len(calls) == 1:
+            raise SystemExit  # not an Exception, so it ends the thread
+        return [text.upper() for text in texts]
+
+    engine = BatchingEngine(run_batch, batch_size=1, max_wait_ms=0, workers=1)
+    try:
+        engine.submit("a")
+        engine._threads[0].join(timeout=5)
+        assert not engine._threads[0].is_alive()
+
+        assert engine.submit("b").result(timeout=5) == "B"
+    finally:
+        engine.close()
+
+
+def test_close_fails_queued_texts_and_skips_cancelled_ones():
+    engine, gate = gated_engine()
+    busy = engine.submit("a")
+    queued = engine.submit("b")
+    cancelled = engine.submit("c")
+    assert cancelled.cancel()
+
+    closer = threading.Thread(target=engine.close)
+    closer.start()
+    gate.set()
+    closer.join(timeout=10)
+
+    assert busy.result(timeout=5) == "A"
+    assert cancelled.cancelled()
+    # "b" was either scored before the shutdown marker or failed by close().
+    assert queued.done()
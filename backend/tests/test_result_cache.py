@@ -0,0 +1,26 @@
+from concurrent.futures import Future
+
+from sentiment import sentiment_analyzer
+
+
+def test_store_ignores_cancelled_future():
+    future = Future()
+    future.cancel()
+
+    sentiment_analyzer._store("cancelled-key", future)
+
+    assert sentiment_analyzer._cache.get("cancelled-key") is None
+
+
+def test_store_caches_scored_result():
+    future = Future()
+    future.set_result({"label": "POSITIVE", "confidence": 0.9, "sentiment_score": 0.9})
+
+    sentiment_analyzer._store("scored-key", future)
+
+    assert sentiment_analyzer._cache.get("scored-key")["label"] == "POSITIVE"
+
+
+def test_cache_key_does_not_truncate():
+    prefix = "word " * 1000
+    assert sentiment_analyzer.cache_key(prefix + "good") != sentiment_analyzer.cache_key(prefix + "bad")
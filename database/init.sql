@@ -26,7 +26,12 @@ CREATE TABLE IF NOT EXISTS posts (
     sentiment_label VARCHAR(20),
     confidence FLOAT CHECK (confidence >= 0 AND confidence <= 1),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    scoring_claimed_at TIMESTAMP WITH TIME ZONE,
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(content, '')), 'B')
+    ) STORED
 );
 
 CREATE TABLE IF NOT EXISTS comments (
@@ -36,7 +41,52 @@ CREATE TABLE IF NOT EXISTS comments (
     content TEXT NOT NULL,
     sentiment_score FLOAT CHECK (sentiment_score >= -1 AND sentiment_score <= 1),
     sentiment_label VARCHAR(20),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    scoring_claimed_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE TABLE IF NOT EXISTS post_sentiment_stats (
+    post_id INTEGER PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    scored_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum FLOAT NOT NULL DEFAULT 0,
+    positive_count INTEGER NOT NULL DEFAULT 0,
+    negative_count INTEGER NOT NULL DEFAULT 0,
+    neutral_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS game_sentiment_stats (
+    game_id INTEGER PRIMARY KEY REFERENCES games(id) ON DELETE CASCADE,
+    post_count INTEGER NOT NULL DEFAULT 0,
+    scored_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum FLOAT NOT NULL DEFAULT 0,
+    positive_count INTEGER NOT NULL DEFAULT 0,
+    negative_count INTEGER NOT NULL DEFAULT 0,
+    neutral_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS game_sentiment_hourly (
+    game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    bucket_start TIMESTAMP NOT NULL,
+    scored_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum FLOAT NOT NULL DEFAULT 0,
+    positive_count INTEGER NOT NULL DEFAULT 0,
+    negative_count INTEGER NOT NULL DEFAULT 0,
+    neutral_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (game_id, bucket_start)
+);
+
+CREATE TABLE IF NOT EXISTS game_sentiment_daily (
+    game_id INTEGER NOT NULL REFERENCES games(id) ON DELETE CASCADE,
+    bucket_start TIMESTAMP NOT NULL,
+    scored_count INTEGER NOT NULL DEFAULT 0,
+    sentiment_sum FLOAT NOT NULL DEFAULT 0,
+    positive_count INTEGER NOT NULL DEFAULT 0,
+    negative_count INTEGER NOT NULL DEFAULT 0,
+    neutral_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (game_id, bucket_start)
 );
 
 
@@ -44,7 +94,12 @@ CREATE INDEX IF NOT EXISTS idx_posts_game_id ON posts(game_id);
 CREATE INDEX IF NOT EXISTS idx_posts_user_id ON posts(user_id);
 CREATE INDEX IF NOT EXISTS idx_posts_sentiment ON posts(sentiment_score) WHERE sentiment_score IS NOT NULL;
 CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_game_created_id ON posts(game_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_posts_pending ON posts(id) WHERE sentiment_label = 'PENDING';
+CREATE INDEX IF NOT EXISTS idx_posts_search ON posts USING GIN (search_vector);
 CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments(post_id);
+CREATE INDEX IF NOT EXISTS idx_comments_post_created_id ON comments(post_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_comments_pending ON comments(id) WHERE sentiment_label = 'PENDING';
 
 INSERT INTO games (name, genre, description, image_url)
 SELECT * FROM (VALUES
@@ -81,6 +136,20 @@ SELECT * FROM (VALUES
 ) AS v(user_id, game_id, title, content)
 WHERE NOT EXISTS (SELECT 1 FROM posts LIMIT 1);
 
+INSERT INTO game_sentiment_stats (game_id, post_count, scored_count, sentiment_sum, positive_count, negative_count, neutral_count)
+SELECT
+    g.id,
+    count(p.id),
+    count(p.sentiment_score),
+    coalesce(sum(p.sentiment_score), 0),
+    count(*) FILTER (WHERE p.sentiment_label = 'POSITIVE'),
+    count(*) FILTER (WHERE p.sentiment_label = 'NEGATIVE'),
+    count(*) FILTER (WHERE p.sentiment_label = 'NEUTRAL')
+FROM games g
+LEFT JOIN posts p ON p.game_id = g.id
+GROUP BY g.id
+ON CONFLICT (game_id) DO NOTHING;
+
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -59,7 +59,7 @@ const GameDiscussion: React.FC = () => {
       const response = await apiClient.get(`/api/posts`, {
         params: { game_id: gameId },
       });
-      setPosts(response.data);
+      setPosts(response.data.items);
     } catch (error) {
       console.error('Error fetching posts:', error);
     } finally {